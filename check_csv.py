@@ -1,17 +1,19 @@
 import pandas as pd
-import io
-import requests
+
+from dhan_client import SCRIP_MASTER_URL, _build_http_session
+
+# Module-level session so repeated checks reuse the pooled connection
+_http = _build_http_session()
 
 def check_csv():
-    url = "https://images.dhan.co/api-data/api-scrip-master.csv"
+    url = SCRIP_MASTER_URL
     print(f"Fetching {url}...")
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        # Using requests to get content first
-        r = requests.get(url, headers=headers)
-        r.raise_for_status()
-        
-        df = pd.read_csv(io.StringIO(r.text), nrows=5)
+        # Stream the response; the parser stops reading after nrows
+        with _http.get(url, stream=True, timeout=30) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            df = pd.read_csv(r.raw, nrows=5)
         print("Columns:", df.columns.tolist())
         print("First row:", df.iloc[0].to_dict())
     except Exception as e:
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+from dataclasses import dataclass, field
+from pydantic import BaseModel
 from typing import Optional, List
 
 class StrategySettings(BaseModel):
@@ -44,7 +45,10 @@ class TradeSignal(BaseModel):
     price: float
     timestamp: str
 
-class StockStatus(BaseModel):
+@dataclass(slots=True)
+class StockStatus:
+    # Plain slotted dataclass, not a pydantic model: process_tick writes these
+    # fields on every tick and validation on __setattr__ is pure overhead there.
     symbol: str
     mode: str # LONG, SHORT, NONE (Closed)
     ltp: float
@@ -63,7 +67,7 @@ class StockStatus(BaseModel):
     last_volume: float = 0.0  # Latest tick volume (as provided by Dhan feed)
     turnover: float = 0.0
     high_watermark: float = 0.0  # For trailing SL tracking
-    order_ids: List[str] = Field(default_factory=list)  # Track all orders for this position
+    order_ids: List[str] = field(default_factory=list)  # Track all orders for this position
     avg_entry_price: float = 0.0  # Average entry price for accurate P&L
     pending_order: str = ""  # Tracks in-flight order intent (prevents duplicate orders)
     last_order_error: str = ""
@@ -71,6 +75,14 @@ class StockStatus(BaseModel):
     cycle_total: int = 1
     cycle_start_mode: str = ""
 
+    def to_dict(self) -> dict:
+        """JSON-ready snapshot (the order_ids list is copied)."""
+        d = {name: getattr(self, name) for name in _STOCK_STATUS_FIELDS}
+        d["order_ids"] = list(self.order_ids)
+        return d
+
+_STOCK_STATUS_FIELDS = tuple(StockStatus.__dataclass_fields__)
+
 class PerformanceSettings(BaseModel):
     """Performance and optimization settings."""
     tick_batch_interval_ms: int = 100
@@ -1,8 +1,25 @@
-import json
 import os
 from datetime import datetime
 from typing import Optional, Tuple
 
+try:
+    import orjson
+
+    def _dumps(payload) -> bytes:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+
+    _loads = orjson.loads
+except ImportError:
+    try:
+        import ujson as json
+    except ImportError:
+        import json
+
+    def _dumps(payload) -> bytes:
+        return json.dumps(payload, indent=2).encode("utf-8")
+
+    _loads = json.loads
+
 from redis_store import load_credentials as load_credentials_redis
 from redis_store import save_credentials as save_credentials_redis
 
@@ -19,8 +36,8 @@ def load_credentials() -> Tuple[Optional[str], Optional[str]]:
         return None, None
 
     try:
-        with open(CREDENTIALS_FILE, "r") as f:
-            data = json.load(f)
+        with open(CREDENTIALS_FILE, "rb") as f:
+            data = _loads(f.read())
     except Exception:
         return None, None
 
@@ -43,6 +60,6 @@ def save_credentials(client_id: str, access_token: str) -> None:
     }
 
     tmp_path = f"{CREDENTIALS_FILE}.tmp"
-    with open(tmp_path, "w") as f:
-        json.dump(payload, f, indent=2)
+    with open(tmp_path, "wb") as f:
+        f.write(_dumps(payload))
     os.replace(tmp_path, CREDENTIALS_FILE)
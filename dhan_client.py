@@ -1,16 +1,20 @@
 import logging
+import numpy as np
 import pandas as pd
 import base64
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
 from dhanhq import dhanhq
 from dhanhq import marketfeed
 import time
 import requests
-import io
 import threading
+import queue
 import asyncio
-from functools import lru_cache
+import struct
+import types
 from collections import deque
+from contextlib import contextmanager
 from pathlib import Path
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
@@ -21,8 +25,61 @@ try:
 except ImportError:
     import json
 
+try:
+    import nest_asyncio
+    _NEST = True
+except ImportError:
+    _NEST = False
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv, compute as pc, parquet as pq
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
 logger = logging.getLogger(__name__)
 
+IST = ZoneInfo("Asia/Kolkata")
+
+_LAT_RING_SIZE = 10_000
+
+SCRIP_MASTER_URL = "https://images.dhan.co/api-data/api-scrip-master.csv"
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+SCRIP_MASTER_COLUMNS = [
+    "SEM_EXM_EXCH_ID",
+    "SEM_INSTRUMENT_NAME",
+    "SEM_TRADING_SYMBOL",
+    "SEM_SMST_SECURITY_ID",
+]
+
+
+def _build_http_session() -> requests.Session:
+    """Keep-alive HTTP session with pooled connections and transient-error retries."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": HTTP_USER_AGENT})
+    return session
+
+
+# Dhan error codes that describe the request/instrument (bad input, no data for the
+# symbol) rather than an unhealthy API; a screen can shrug these off per symbol.
+HISTORY_DATA_ERROR_CODES = frozenset({"DH-905", "DH-907"})
+
+
+class HistoryFetchError(Exception):
+    """Historical fetch failed at the transport/HTTP level (not a per-symbol 'no data')."""
+
 
 class RateLimiter:
     """Token bucket rate limiter for API calls."""
@@ -54,12 +111,14 @@ class RateLimiter:
         self.max_requests_per_second = max_requests_per_second
         self.max_connections = max_connections
 
-        # Avoid an initial burst (token bucket starts empty).
-        self.tokens = 0.0
-        self.last_update = time.time()
+        # Bucket state is a single "zero time": the instant at which the bucket was
+        # empty. Tokens available at `now` are (now - zero_time) * rps, capped at 1.
+        # All limiter timing uses the monotonic clock (immune to NTP/wall-clock jumps).
+        # Starting at "now" avoids an initial burst (bucket starts empty).
+        self._zero_time = time.monotonic()
         self.lock = threading.Lock()
-        self.active_connections = 0
-        self.connection_lock = threading.Lock()
+        # Waiters block on the semaphore's condition and wake as soon as a slot is released.
+        self._conn_sem = threading.BoundedSemaphore(max_connections)
 
         # Temporary server-rate-limit penalty window.
         self._penalty_until = 0.0
@@ -76,7 +135,7 @@ class RateLimiter:
         if cooldown_seconds <= 0:
             return
 
-        now = time.time()
+        now = time.monotonic()
         with self.lock:
             self._penalty_until = max(self._penalty_until, now + cooldown_seconds)
             if penalty_rps is not None:
@@ -96,6 +155,14 @@ class RateLimiter:
             rps = min(rps, float(self._penalty_rps))
         return max(0.0001, rps)
     
+    def _compare_and_set_zero_time(self, expected: float, new: float) -> bool:
+        """Commit a new zero time only if no other thread changed it since it was read."""
+        with self.lock:
+            if self._zero_time != expected:
+                return False
+            self._zero_time = new
+            return True
+    
     def acquire(self, retry_on_limit=True, max_retries=3, max_wait_seconds=None):
         """
         Acquire a token to make an API request.
@@ -110,33 +177,19 @@ class RateLimiter:
             True if token acquired, False if max retries exceeded
         """
         retries = 0
-        start = time.time()
+        start = time.monotonic()
 
         # If max_retries is None, we wait indefinitely (subject to max_wait_seconds if set).
         while True:
-            with self.lock:
-                now = time.time()
-                rps = self._effective_rps(now)
-
-                # Refill tokens based on time elapsed
-                elapsed = now - self.last_update
-                # Keep bucket capacity at 1 to avoid bursts (smooth request spacing).
-                self.tokens = min(1.0, self.tokens + elapsed * rps)
-                self.last_update = now
-                
-                # Check if we have a token available
-                if self.tokens >= 1.0:
-                    self.tokens -= 1.0
-                    return True
-                
-                # Calculate wait time
-                wait_time = (1.0 - self.tokens) / rps
+            wait_time = self._try_consume()
+            if wait_time <= 0:
+                return True
             
             # If not retrying, return False
             if not retry_on_limit:
                 return False
 
-            if max_wait_seconds is not None and (time.time() - start) >= float(max_wait_seconds):
+            if max_wait_seconds is not None and (time.monotonic() - start) >= float(max_wait_seconds):
                 logger.warning(f"Rate limiter wait exceeded {max_wait_seconds}s")
                 return False
 
@@ -152,19 +205,44 @@ class RateLimiter:
             time.sleep(wait_time)
             retries += 1
     
+    def _try_consume(self) -> float:
+        """Consume a token if one is available; return 0.0, else seconds to wait."""
+        while True:
+            # Optimistic read: compute tokens from a snapshot without holding the lock.
+            zero_old = self._zero_time
+            now = time.monotonic()
+            rps = self._effective_rps(now)
+            # Keep bucket capacity at 1 to avoid bursts (smooth request spacing).
+            tokens = min(1.0, (now - zero_old) * rps)
+
+            if tokens >= 1.0:
+                zero_new = now - (tokens - 1.0) / rps
+                if self._compare_and_set_zero_time(zero_old, zero_new):
+                    return 0.0
+                # Another thread consumed the token first; re-read and retry.
+                continue
+
+            return (1.0 - tokens) / rps
+
     def acquire_connection(self):
         """Acquire a connection slot. Blocks until available."""
-        while True:
-            with self.connection_lock:
-                if self.active_connections < self.max_connections:
-                    self.active_connections += 1
-                    return
-            time.sleep(0.1)
+        self._conn_sem.acquire()
     
     def release_connection(self):
         """Release a connection slot."""
-        with self.connection_lock:
-            self.active_connections = max(0, self.active_connections - 1)
+        try:
+            self._conn_sem.release()
+        except ValueError:
+            logger.debug("release_connection called with no slot held")
+
+    @contextmanager
+    def connection(self):
+        """Hold a connection slot for the duration of the block (released on exceptions too)."""
+        self.acquire_connection()
+        try:
+            yield
+        finally:
+            self.release_connection()
 
 class DhanClientWrapper:
     def __init__(self, max_requests_per_second=1.0, max_connections=5):
@@ -180,14 +258,24 @@ class DhanClientWrapper:
         self.access_token = None
         self.is_connected = False
         self.symbol_map = {}
+        self._sid_by_symbol = {}
+        self._instrument_by_symbol = {}
+        self._instruments = []
         self.id_map = {}
+        self.id_arr = None  # security_id -> tick symbol ('-EQ' stripped), direct-indexed
         self.feed = None
         self.ws_thread = None
+        # One event loop for the feed, reused across re-subscribes (not rebuilt per start)
+        self._ws_loop = None
+        self._ws_future = None
         self._ws_stop = threading.Event()
         self._ws_lock = threading.Lock()
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 10
         self.reconnect_delay = 5
+
+        # Pooled HTTP session (reuses TCP/TLS across scrip-master fetches)
+        self._http = _build_http_session()
         
         # Rate limiting
         self.rate_limiter = RateLimiter(
@@ -196,14 +284,25 @@ class DhanClientWrapper:
         )
         
         # Performance optimizations
-        self.tick_batch = []
-        self.tick_batch_lock = threading.Lock()
+        # Parsed-tick batch buffer: deque append/popleft are atomic under the GIL,
+        # so no Python-level lock is needed around it. Unbounded on purpose: _tick_q
+        # already caps (and counts) raw ticks, so nothing parsed is silently evicted.
+        self.tick_batch = deque()
+        self.tick_drain_thread = None
+        # Raw ticks handed off by the WebSocket thread; parsed on the tick-drain thread.
+        self._tick_q: "queue.Queue" = queue.Queue(maxsize=50000)
+        self._ticks_dropped = 0
+        self._last_tick_drop_log = 0.0
         self.last_batch_process = time.time()
         self.batch_interval = 0.1  # 100ms batching
         
         # Tick diagnostics
         self._tick_count = 0
         self._last_tick_log = 0.0
+        # Tick latency ring buffer (ms); summarized as percentiles every 10s
+        self._lat_ring = np.zeros(_LAT_RING_SIZE, dtype=np.float32)
+        self._lat_idx = 0
+        self._volume_key = None
         self._last_unknown_tick_log = 0.0
         self._mapping_lock = threading.Lock()
         self._security_master_refresh_attempted = False
@@ -212,6 +311,9 @@ class DhanClientWrapper:
         self._security_master_cache_path = Path(__file__).resolve().parent / "security_master_nse_eq_cache.json"
         self._security_master_cache_max_age_days = 7
 
+        # Closed daily bars never change: cache them per symbol so reruns fetch only the delta
+        self._bars_cache_dir = Path(__file__).resolve().parent / "bars_cache"
+
     @staticmethod
     def _extract_client_id_from_token(access_token: str):
         """Best-effort extract Dhan client id from JWT access token payload."""
@@ -249,7 +351,16 @@ class DhanClientWrapper:
                         )
                     client_id = token_client_id
 
-            self.dhan = dhanhq(client_id, access_token)
+            # Size the SDK's keep-alive pool for our concurrency so parallel history
+            # fetches reuse warm TCP/TLS connections instead of discarding them.
+            self.dhan = dhanhq(
+                client_id,
+                access_token,
+                pool={
+                    "pool_connections": 4,
+                    "pool_maxsize": max(16, int(self.rate_limiter.max_connections)),
+                },
+            )
             self.client_id = client_id
             self.access_token = access_token
             
@@ -279,40 +390,118 @@ class DhanClientWrapper:
                 if self._try_load_security_master_cache():
                     return
 
-                url = "https://images.dhan.co/api-data/api-scrip-master.csv"
                 logger.info("Fetching Security Master CSV...")
                 
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                r = requests.get(url, headers=headers, timeout=30)
-                r.raise_for_status()
-                
-                df = pd.read_csv(io.StringIO(r.text))
-                
-                # Filter for NSE Equity
-                equity_df = df[
-                    (df['SEM_EXM_EXCH_ID'] == 'NSE') & 
-                    (df['SEM_INSTRUMENT_NAME'] == 'EQUITY')
-                ]
-                
-                if equity_df.empty:
-                    logger.warning("No NSE Equity records found, trying broad filter")
-                    equity_df = df
-                
-                # Create symbol mapping
-                self.symbol_map = dict(zip(
-                    equity_df['SEM_TRADING_SYMBOL'], 
-                    equity_df['SEM_SMST_SECURITY_ID']
-                ))
+                # Conditional GET: if the CSV hasn't changed since the (stale) cache was
+                # written, the server answers 304 and we reuse the cached mapping.
+                validators = self._load_security_master_validators()
+                conditional_headers = {}
+                if validators.get("etag"):
+                    conditional_headers["If-None-Match"] = validators["etag"]
+                if validators.get("last_modified"):
+                    conditional_headers["If-Modified-Since"] = validators["last_modified"]
+
+                r = self._http.get(
+                    SCRIP_MASTER_URL, headers=conditional_headers, stream=True, timeout=30
+                )
+                if r.status_code == 304:
+                    r.close()
+                    if self._try_load_security_master_cache(ignore_age=True):
+                        logger.info("Security Master unchanged (HTTP 304); refreshed cache timestamp")
+                        self._security_master_cache_path.touch()
+                        return
+                    # Cache body unusable; fall back to a full download.
+                    r = self._http.get(SCRIP_MASTER_URL, stream=True, timeout=30)
+
+                with r:
+                    r.raise_for_status()
+                    validators = {
+                        "etag": r.headers.get("ETag"),
+                        "last_modified": r.headers.get("Last-Modified"),
+                    }
+                    # Stream the body straight into the parser (no intermediate str/StringIO
+                    # copy) and only materialize the columns we actually use.
+                    r.raw.decode_content = True
+                    if _HAS_PYARROW:
+                        syms, ids = self._parse_security_master_arrow(r.raw)
+                    else:
+                        syms, ids = self._parse_security_master_pandas(r.raw)
+
+                # Create symbol + reverse mappings from plain Python lists
+                self.symbol_map = dict(zip(syms, ids))
+                self.id_map = dict(zip(ids, syms))
+                self._build_sid_lookup()
+                self._build_id_array()
                 
                 logger.info(f"Loaded {len(self.symbol_map)} security mappings")
-                self._save_security_master_cache()
+                self._save_security_master_cache(validators)
                 
             except Exception as e:
                 logger.error(f"Failed to fetch Security Master: {e}")
 
-    def _try_load_security_master_cache(self) -> bool:
+    @staticmethod
+    def _parse_security_master_arrow(stream):
+        """Parse the scrip master with pyarrow's multi-threaded CSV reader; return (symbols, ids)."""
+        table = pacsv.read_csv(
+            stream,
+            convert_options=pacsv.ConvertOptions(
+                include_columns=SCRIP_MASTER_COLUMNS,
+                column_types={
+                    "SEM_SMST_SECURITY_ID": pa.int64(),
+                    "SEM_TRADING_SYMBOL": pa.string(),
+                    "SEM_EXM_EXCH_ID": pa.string(),
+                    "SEM_INSTRUMENT_NAME": pa.string(),
+                },
+            ),
+        )
+
+        # Filter for NSE Equity before converting anything to Python objects
+        mask = pc.and_(
+            pc.equal(table["SEM_EXM_EXCH_ID"], "NSE"),
+            pc.equal(table["SEM_INSTRUMENT_NAME"], "EQUITY"),
+        )
+        equity = table.filter(mask)
+        if equity.num_rows == 0:
+            logger.warning("No NSE Equity records found, trying broad filter")
+            equity = table
+
+        return (
+            equity["SEM_TRADING_SYMBOL"].to_pylist(),
+            equity["SEM_SMST_SECURITY_ID"].to_pylist(),
+        )
+
+    @staticmethod
+    def _parse_security_master_pandas(stream):
+        """pandas fallback for _parse_security_master_arrow when pyarrow is not installed."""
+        df = pd.read_csv(
+            stream,
+            usecols=SCRIP_MASTER_COLUMNS,
+            dtype={
+                "SEM_SMST_SECURITY_ID": "int64",
+                "SEM_TRADING_SYMBOL": "string",
+                # Low-cardinality columns: compare on category codes, not strings
+                "SEM_EXM_EXCH_ID": "category",
+                "SEM_INSTRUMENT_NAME": "category",
+            },
+        )
+
+        # Filter for NSE Equity
+        equity_df = df[
+            (df['SEM_EXM_EXCH_ID'] == 'NSE') &
+            (df['SEM_INSTRUMENT_NAME'] == 'EQUITY')
+        ]
+
+        if equity_df.empty:
+            logger.warning("No NSE Equity records found, trying broad filter")
+            equity_df = df
+
+        # Plain Python lists (avoids boxing every element through the Series iterator)
+        return (
+            equity_df['SEM_TRADING_SYMBOL'].to_numpy(dtype=object).tolist(),
+            equity_df['SEM_SMST_SECURITY_ID'].to_numpy(dtype=np.int64).tolist(),
+        )
+
+    def _try_load_security_master_cache(self, ignore_age: bool = False) -> bool:
         """Load cached NSE_EQ security master mapping if fresh enough."""
         try:
             if not self._security_master_cache_path.exists():
@@ -320,7 +509,7 @@ class DhanClientWrapper:
 
             age_seconds = time.time() - self._security_master_cache_path.stat().st_mtime
             max_age_seconds = self._security_master_cache_max_age_days * 86400
-            if age_seconds > max_age_seconds:
+            if age_seconds > max_age_seconds and not ignore_age:
                 return False
 
             raw = self._security_master_cache_path.read_text(encoding="utf-8")
@@ -329,7 +518,8 @@ class DhanClientWrapper:
             if not isinstance(symbol_map, dict) or not symbol_map:
                 return False
 
-            self.symbol_map = symbol_map
+            self.symbol_map = {sym: int(sid) for sym, sid in symbol_map.items()}
+            self._build_sid_lookup()
             logger.info(
                 f"Loaded security master mapping from cache ({len(self.symbol_map)} symbols)"
             )
@@ -338,7 +528,22 @@ class DhanClientWrapper:
             logger.debug(f"Security master cache load failed: {e}")
             return False
 
-    def _save_security_master_cache(self) -> None:
+    def _load_security_master_validators(self) -> dict:
+        """Return the HTTP validators (ETag / Last-Modified) stored with the cache, if any."""
+        try:
+            if not self._security_master_cache_path.exists():
+                return {}
+            raw = self._security_master_cache_path.read_text(encoding="utf-8")
+            payload = json.loads(raw) if raw else {}
+            return {
+                "etag": payload.get("etag"),
+                "last_modified": payload.get("last_modified"),
+            }
+        except Exception as e:
+            logger.debug(f"Security master cache validators load failed: {e}")
+            return {}
+
+    def _save_security_master_cache(self, validators: dict = None) -> None:
         """Persist current symbol_map to disk for faster next startup."""
         try:
             if not self.symbol_map:
@@ -347,6 +552,9 @@ class DhanClientWrapper:
                 "saved_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
                 "symbol_map": self.symbol_map,
             }
+            if validators:
+                payload["etag"] = validators.get("etag")
+                payload["last_modified"] = validators.get("last_modified")
             self._security_master_cache_path.write_text(
                 json.dumps(payload), encoding="utf-8"
             )
@@ -370,24 +578,46 @@ class DhanClientWrapper:
         """Build reverse mapping for O(1) lookups."""
         # Keep IDs as integers in reverse mapping
         self.id_map = {int(v): k for k, v in self.symbol_map.items()}
+        self._build_id_array()
         logger.info(f"Built reverse mapping with {len(self.id_map)} entries")
 
-    @lru_cache(maxsize=1000)
-    def get_security_id(self, symbol):
-        """Returns Security ID for a symbol as an integer (cached)."""
-        symbol = str(symbol).strip().upper()
-        if not symbol:
-            return None
+    def _build_id_array(self):
+        """Build a direct-indexed security_id -> symbol table for the tick path."""
+        if not self.id_map:
+            self.id_arr = None
+            return
+        ids = np.fromiter(self.id_map.keys(), dtype=np.int64, count=len(self.id_map))
+        max_sid = int(ids.max())
+        if ids.min() < 0 or max_sid > 5_000_000:
+            # Ids too sparse/large for a dense table; dict lookup remains the fallback.
+            self.id_arr = None
+            return
+        names = [sym[:-3] if sym.endswith("-EQ") else sym for sym in self.id_map.values()]
+        arr = np.full(max_sid + 1, None, dtype=object)
+        arr[ids] = names
+        # Plain list: scalar indexing is cheaper than on a numpy object array.
+        self.id_arr = arr.tolist()
+
+    def _build_sid_lookup(self):
+        """Build a single symbol -> security-id map that also resolves bare '-EQ' names."""
+        lookup = {}
+        for sym, sid in self.symbol_map.items():
+            if sym.endswith("-EQ"):
+                lookup[sym[:-3]] = sid
+        # Exact symbols win over '-EQ' stripped aliases.
+        lookup.update(self.symbol_map)
+        self._sid_by_symbol = lookup
+
+        # WebSocket subscription tuples; subscribe to Quote to get volume (needed for turnover filters)
+        exch_code = marketfeed.NSE
+        quote = marketfeed.Quote
+        self._instrument_by_symbol = {
+            sym: (exch_code, str(sid), quote) for sym, sid in lookup.items()
+        }
 
-        # Try direct match
-        if symbol in self.symbol_map:
-            return int(self.symbol_map[symbol])
-            
-        # Try appending '-EQ'
-        if f"{symbol}-EQ" in self.symbol_map:
-             return int(self.symbol_map[f"{symbol}-EQ"])
-             
-        return None
+    def get_security_id(self, symbol):
+        """Returns Security ID for a symbol as an integer."""
+        return self._sid_by_symbol.get(str(symbol).strip().upper())
 
     def subscribe(self, symbols, callback):
         """Subscribes to real-time feed for the list of symbols."""
@@ -410,23 +640,19 @@ class DhanClientWrapper:
 
             logger.info(f"Subscribing to {len(symbols)} symbols...")
             
-            # Map symbols to IDs (as integers, then convert to string for websocket subscription)
-            sub_list = []
+            # Map symbols to prebuilt (exchange, security_id str, Quote) instrument tuples
+            instruments = []
             for s in symbols:
-                sid = self.get_security_id(s)  # Returns int
-                if sid:
-                    sub_list.append(int(sid))
+                inst = self._instrument_by_symbol.get(str(s).strip().upper())
+                if inst:
+                    instruments.append(inst)
                 else:
                     logger.warning(f"Could not map {s} for subscription")
 
-            if not sub_list:
+            if not instruments:
                 logger.warning("No valid symbols to subscribe")
                 return
-
-            # Prepare instruments list
-            # Use Dhan SDK constants; subscribe to Quote to get volume (needed for turnover filters)
-            exch_code = marketfeed.NSE  # NSE
-            instruments = [(exch_code, str(sid), marketfeed.Quote) for sid in sub_list]
+            self._instruments = instruments
             
             logger.info(f"Starting DhanFeed for {len(instruments)} instruments")
             
@@ -441,9 +667,6 @@ class DhanClientWrapper:
 
             # Patch SDK server-disconnect handler to log reason (SDK prints to stdout by default)
             try:
-                import struct
-                import types
-
                 def _server_disconnection(self_feed, data):
                     try:
                         packet = struct.unpack("<BHBIH", data[0:10])
@@ -474,115 +697,134 @@ class DhanClientWrapper:
             self._callback = callback
             self._symbols = list(symbols)
             
-            # Run WebSocket loop in a dedicated thread
-            def run_feed_in_thread():
-                """Run DhanFeed in separate thread and consume ticks."""
-                import asyncio
-
-                try:
-                    import nest_asyncio
-                    nest_asyncio.apply()
-                    logger.info("Applied nest_asyncio for better compatibility")
-                except ImportError:
-                    logger.warning("nest_asyncio not available, continuing without it")
-                except Exception as e:
-                    logger.warning(f"Could not apply nest_asyncio: {e}")
-
-                async def _run():
-                    self.reconnect_attempts = 0
-                    while not self._ws_stop.is_set():
-                        try:
-                            await self.feed.connect()
-                            logger.info("Dhan WebSocket Connected Successfully")
-                            self._on_ws_connect(self.feed)
-
-                            # Reset attempts after a successful connect
-                            self.reconnect_attempts = 0
-
-                            while not self._ws_stop.is_set():
-                                tick = await self.feed.get_instrument_data()
-                                if getattr(self.feed, "on_close", False):
-                                    code = getattr(self.feed, "last_disconnect_code", None)
-                                    reason = getattr(self.feed, "last_disconnect_reason", "unknown")
-                                    fatal_codes = {806, 807, 808, 809}
-                                    if code in fatal_codes:
-                                        logger.error(
-                                            f"Fatal Dhan disconnect (code={code}): {reason}. "
-                                            "Stopping feed; refresh credentials / subscription."
-                                        )
-                                        self._ws_stop.set()
-                                    raise ConnectionError(f"Dhan server disconnect (code={code}): {reason}")
-
-                                if tick:
-                                    self._on_tick(tick, callback)
-                        except ConnectionError as e:
-                            logger.error(str(e))
-                            self._on_ws_error(self.feed, e)
-                            self.reconnect_attempts += 1
-
-                            code = getattr(self.feed, "last_disconnect_code", None)
-                            if code == 805:
-                                # Too many active connections; back off hard
-                                backoff = min(10 * (2 ** min(self.reconnect_attempts, 6)), 300)
-                            else:
-                                backoff = min(2 * (2 ** min(self.reconnect_attempts, 6)), 60)
-
-                            if self._ws_stop.is_set():
-                                break
-                            await asyncio.sleep(backoff)
-                        except ConnectionClosedError as e:
-                            logger.warning(f"WebSocket closed unexpectedly: {e}")
-                            self._on_ws_error(self.feed, e)
-                            self.reconnect_attempts += 1
-                            backoff = min(2 * (2 ** min(self.reconnect_attempts, 6)), 60)
-                            if self._ws_stop.is_set():
-                                break
-                            await asyncio.sleep(backoff)
-                        except InvalidStatus as e:
-                            # 429 = too many requests / connections; back off hard
-                            logger.error(f"WebSocket handshake rejected: {e}", exc_info=True)
-                            self._on_ws_error(self.feed, e)
-                            self.reconnect_attempts += 1
+            # Feed coroutine; runs on the persistent WebSocket event loop thread
+            async def _run():
+                self.reconnect_attempts = 0
+                while not self._ws_stop.is_set():
+                    try:
+                        await self.feed.connect()
+                        logger.info("Dhan WebSocket Connected Successfully")
+                        self._on_ws_connect(self.feed)
+
+                        # Reset attempts after a successful connect
+                        self.reconnect_attempts = 0
+
+                        while not self._ws_stop.is_set():
+                            tick = await self.feed.get_instrument_data()
+                            if getattr(self.feed, "on_close", False):
+                                code = getattr(self.feed, "last_disconnect_code", None)
+                                reason = getattr(self.feed, "last_disconnect_reason", "unknown")
+                                fatal_codes = {806, 807, 808, 809}
+                                if code in fatal_codes:
+                                    logger.error(
+                                        f"Fatal Dhan disconnect (code={code}): {reason}. "
+                                        "Stopping feed; refresh credentials / subscription."
+                                    )
+                                    self._ws_stop.set()
+                                raise ConnectionError(f"Dhan server disconnect (code={code}): {reason}")
+
+                            if tick:
+                                self._enqueue_raw_tick(tick)
+                    except ConnectionError as e:
+                        logger.error(str(e))
+                        self._on_ws_error(self.feed, e)
+                        self.reconnect_attempts += 1
+
+                        code = getattr(self.feed, "last_disconnect_code", None)
+                        if code == 805:
+                            # Too many active connections; back off hard
                             backoff = min(10 * (2 ** min(self.reconnect_attempts, 6)), 300)
-                            if self._ws_stop.is_set():
-                                break
-                            await asyncio.sleep(backoff)
-                        except Exception as e:
-                            logger.error(f"WebSocket error in thread: {e}", exc_info=True)
-                            self._on_ws_error(self.feed, e)
-                            self.reconnect_attempts += 1
+                        else:
                             backoff = min(2 * (2 ** min(self.reconnect_attempts, 6)), 60)
-                            if self._ws_stop.is_set():
-                                break
-                            await asyncio.sleep(backoff)
-                        finally:
-                            try:
-                                if getattr(self.feed, "ws", None):
-                                    await self.feed.ws.close()
-                            except Exception:
-                                pass
-                            try:
-                                setattr(self.feed, "ws", None)
-                            except Exception:
-                                pass
-                            self._on_ws_close(self.feed)
-
-                asyncio.run(_run())
+
+                        if self._ws_stop.is_set():
+                            break
+                        await asyncio.sleep(backoff)
+                    except ConnectionClosedError as e:
+                        logger.warning(f"WebSocket closed unexpectedly: {e}")
+                        self._on_ws_error(self.feed, e)
+                        self.reconnect_attempts += 1
+                        backoff = min(2 * (2 ** min(self.reconnect_attempts, 6)), 60)
+                        if self._ws_stop.is_set():
+                            break
+                        await asyncio.sleep(backoff)
+                    except InvalidStatus as e:
+                        # 429 = too many requests / connections; back off hard
+                        logger.error(f"WebSocket handshake rejected: {e}", exc_info=True)
+                        self._on_ws_error(self.feed, e)
+                        self.reconnect_attempts += 1
+                        backoff = min(10 * (2 ** min(self.reconnect_attempts, 6)), 300)
+                        if self._ws_stop.is_set():
+                            break
+                        await asyncio.sleep(backoff)
+                    except Exception as e:
+                        logger.error(f"WebSocket error in thread: {e}", exc_info=True)
+                        self._on_ws_error(self.feed, e)
+                        self.reconnect_attempts += 1
+                        backoff = min(2 * (2 ** min(self.reconnect_attempts, 6)), 60)
+                        if self._ws_stop.is_set():
+                            break
+                        await asyncio.sleep(backoff)
+                    finally:
+                        try:
+                            if getattr(self.feed, "ws", None):
+                                await self.feed.ws.close()
+                        except Exception:
+                            pass
+                        try:
+                            setattr(self.feed, "ws", None)
+                        except Exception:
+                            pass
+                        self._on_ws_close(self.feed)
 
             with self._ws_lock:
-                # Ensure we don't start multiple websocket threads
-                if self.ws_thread and self.ws_thread.is_alive():
-                    logger.info("WebSocket thread already running; skipping new start")
+                # Ensure we don't start multiple websocket feed coroutines
+                if self._ws_future and not self._ws_future.done():
+                    logger.info("WebSocket feed already running; skipping new start")
                     return
                 self._ws_stop.clear()
-                self.ws_thread = threading.Thread(target=run_feed_in_thread, daemon=True)
-                self.ws_thread.start()
+                loop = self._ensure_ws_loop()
+                self._ws_future = asyncio.run_coroutine_threadsafe(_run(), loop)
+                if not (self.tick_drain_thread and self.tick_drain_thread.is_alive()):
+                    self.tick_drain_thread = threading.Thread(
+                        target=self._tick_drain_loop, name="tick-drain", daemon=True
+                    )
+                    self.tick_drain_thread.start()
             
-            logger.info("WebSocket Thread Started")
+            logger.info("WebSocket feed started")
             
         except Exception as e:
             logger.error(f"Subscription failed: {e}")
 
+    def _ensure_ws_loop(self):
+        """Return the persistent WebSocket event loop, starting its thread on first use."""
+        if self._ws_loop is not None and self.ws_thread and self.ws_thread.is_alive():
+            return self._ws_loop
+
+        loop = asyncio.new_event_loop()
+        if _NEST:
+            try:
+                nest_asyncio.apply(loop)
+            except Exception as e:
+                logger.warning(f"Could not apply nest_asyncio: {e}")
+
+        def _loop_main():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_forever()
+            finally:
+                # Stopped by close(): let the cancelled feed coroutine unwind before exiting.
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+        self._ws_loop = loop
+        self.ws_thread = threading.Thread(target=_loop_main, name="dhan-ws-loop", daemon=True)
+        self.ws_thread.start()
+        return loop
+
     def _on_ws_connect(self, instance):
         logger.info("Dhan WebSocket Connected")
         self.reconnect_attempts = 0
@@ -598,6 +840,46 @@ class DhanClientWrapper:
         """Stop websocket feed and prevent reconnection attempts."""
         self._ws_stop.set()
 
+    def _stop_ws_loop(self, timeout: float = 5.0):
+        """Cancel the feed coroutine, stop the persistent WebSocket loop and join its threads."""
+        with self._ws_lock:
+            future, self._ws_future = self._ws_future, None
+            loop, self._ws_loop = self._ws_loop, None
+            ws_thread, self.ws_thread = self.ws_thread, None
+            drain_thread, self.tick_drain_thread = self.tick_drain_thread, None
+        if future is not None:
+            future.cancel()
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(loop.stop)
+            except RuntimeError:
+                pass
+        for thread in (ws_thread, drain_thread):
+            if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout)
+        if loop is not None and not loop.is_closed() and not (ws_thread and ws_thread.is_alive()):
+            loop.close()
+
+    def close(self):
+        """Stop the feed, shut down the WebSocket loop thread and release pooled HTTP connections."""
+        self.stop_feed()
+        self._stop_ws_loop()
+        for session in (self._http, getattr(self.dhan, "session", None)):
+            if session is not None:
+                try:
+                    session.close()
+                except Exception:
+                    pass
+
+    async def aclose(self):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
     def _handle_reconnect(self):
         """Handle WebSocket reconnection with exponential backoff."""
         if self.reconnect_attempts >= self.max_reconnect_attempts:
@@ -618,9 +900,7 @@ class DhanClientWrapper:
             logger.error(f"Reconnection failed: {e}")
 
     def _on_tick(self, tick_data, callback):
-        """Process tick data with batching for performance."""
-        start_time = time.time()
-        
+        """Parse raw tick data into the batch buffer (runs on the tick-drain thread)."""
         try:
             # Handle list/batched tick payloads
             if isinstance(tick_data, list):
@@ -636,20 +916,25 @@ class DhanClientWrapper:
             if not isinstance(tick_data, dict):
                 return
 
-            # Extract security id (support multiple key names)
-            sid_val = (
-                tick_data.get('security_id')
-                or tick_data.get('securityId')
-                or tick_data.get('sec_id')
-            )
-
-            # Extract LTP (support multiple key names)
-            ltp_val = (
-                tick_data.get('LTP')
-                or tick_data.get('ltp')
-                or tick_data.get('last_traded_price')
-                or tick_data.get('last_price')
-            )
+            # Fast path: the SDK's Quote/Ticker packets always carry these keys
+            try:
+                sid_val = tick_data['security_id']
+                ltp_val = tick_data['LTP']
+            except KeyError:
+                # Extract security id (support multiple key names)
+                sid_val = (
+                    tick_data.get('security_id')
+                    or tick_data.get('securityId')
+                    or tick_data.get('sec_id')
+                )
+
+                # Extract LTP (support multiple key names)
+                ltp_val = (
+                    tick_data.get('LTP')
+                    or tick_data.get('ltp')
+                    or tick_data.get('last_traded_price')
+                    or tick_data.get('last_price')
+                )
 
             if sid_val is None or ltp_val is None:
                 now = time.time()
@@ -661,32 +946,89 @@ class DhanClientWrapper:
             sid = int(sid_val)
             ltp = float(ltp_val)
                 
-            # Extract Volume
-            volume = 0.0
-            if 'volume' in tick_data:
-                volume = float(tick_data['volume'])
-            elif 'total_volume' in tick_data:
-                volume = float(tick_data['total_volume'])
-                
-            # Get symbol from reverse mapping
-            symbol = self.id_map.get(sid)
-            if symbol and symbol.endswith("-EQ"):
-                symbol = symbol[:-3]
+            # Extract Volume (key resolved once from the first tick that carries one)
+            volume_key = self._volume_key
+            if volume_key is None:
+                if 'volume' in tick_data:
+                    volume_key = self._volume_key = 'volume'
+                elif 'total_volume' in tick_data:
+                    volume_key = self._volume_key = 'total_volume'
+            volume = float(tick_data.get(volume_key, 0.0)) if volume_key else 0.0
+
+            self.tick_batch.append((sid, ltp, volume, time.perf_counter()))
+                    
+        except Exception as e:
+            logger.error(f"Tick processing error: {e}")
+
+    def _drain_tick_batch(self):
+        """Pop everything buffered so far (popleft is atomic; no lock needed)."""
+        n = len(self.tick_batch)
+        return [self.tick_batch.popleft() for _ in range(n)]
+
+    def _enqueue_raw_tick(self, tick_data):
+        """Hand a raw tick to the tick-drain thread (WebSocket thread returns to recv immediately)."""
+        try:
+            self._tick_q.put_nowait(tick_data)
+        except queue.Full:
+            self._ticks_dropped += 1
+            now = time.time()
+            if now - self._last_tick_drop_log > 5.0:
+                logger.warning(f"Tick queue full - dropped {self._ticks_dropped} ticks so far")
+                self._last_tick_drop_log = now
+
+    def _tick_drain_loop(self):
+        """Parse queued raw ticks and dispatch each coalesced batch to the strategy callback."""
+        while not self._ws_stop.is_set():
+            try:
+                raw = self._tick_q.get(timeout=self.batch_interval)
+            except queue.Empty:
+                continue
+            # Read per batch so a re-subscribe with a new callback takes effect on a live thread.
+            callback = self._callback
+            self._on_tick(raw, callback)
+
+            # Coalesce everything else that arrived meanwhile into the same batch.
+            while True:
+                try:
+                    raw = self._tick_q.get_nowait()
+                except queue.Empty:
+                    break
+                self._on_tick(raw, callback)
+
+            self.last_batch_process = time.time()
+            for sid, ltp, volume, received_at in self._drain_tick_batch():
+                self._dispatch_tick(sid, ltp, volume, received_at, callback)
+
+    def _dispatch_tick(self, sid, ltp, volume, received_at, callback):
+        """Resolve symbol for a parsed tick and invoke the strategy callback."""
+        try:
+            # Get symbol from the direct-indexed table (dict reverse mapping as fallback)
+            id_arr = self.id_arr
+            if id_arr is not None and 0 <= sid < len(id_arr):
+                symbol = id_arr[sid]
+            else:
+                symbol = self.id_map.get(sid)
+                if symbol and symbol.endswith("-EQ"):
+                    symbol = symbol[:-3]
             if symbol:
                 try:
-                    # Call callback directly for low latency
                     callback(symbol, ltp, volume)
                     
+                    # Record latency (includes time spent waiting in the batch buffer)
+                    self._lat_ring[self._lat_idx % _LAT_RING_SIZE] = (time.perf_counter() - received_at) * 1000
+                    self._lat_idx += 1
+
                     self._tick_count += 1
                     now = time.time()
                     if now - self._last_tick_log > 10.0:
-                        logger.info(f"Ticks received: {self._tick_count} (last: {symbol} {ltp})")
+                        p50, p95, p99 = np.percentile(
+                            self._lat_ring[:min(self._lat_idx, _LAT_RING_SIZE)], [50, 95, 99]
+                        )
+                        logger.info(
+                            f"Ticks received: {self._tick_count} (last: {symbol} {ltp}); "
+                            f"latency ms p50={p50:.2f} p95={p95:.2f} p99={p99:.2f}"
+                        )
                         self._last_tick_log = now
-                    
-                    # Record performance
-                    latency_ms = (time.time() - start_time) * 1000
-                    if latency_ms > 10:  # Log only if > 10ms
-                        logger.debug(f"Tick processing took {latency_ms:.2f}ms")
                         
                 except TypeError:
                     # Fallback for old signature
@@ -695,20 +1037,101 @@ class DhanClientWrapper:
         except Exception as e:
             logger.error(f"Tick processing error: {e}")
 
-    async def get_historical_data_async(self, symbol, exchange_segment="NSE_EQ", days=15):
+    async def get_historical_data_async(self, symbol, exchange_segment="NSE_EQ", days=15, raise_on_error=False):
         """Async version of historical data fetching."""
-        # For now, call sync version in thread pool
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(
             None, 
             self.get_historical_data, 
             symbol, 
             exchange_segment, 
-            days
+            days,
+            raise_on_error,
         )
 
-    def get_historical_data(self, symbol, exchange_segment="NSE_EQ", days=15):
-        """Fetches historical data for the last N days with rate limiting."""
+    async def get_historical_data_many(self, symbols, exchange_segment="NSE_EQ", days=15, max_concurrency=None):
+        """
+        Fetch historical data for many symbols concurrently.
+
+        In-flight fetches are bounded by the connection limit (the rate limiter still
+        spaces the actual REST calls), so network waits overlap instead of running
+        one symbol at a time.
+
+        Returns a dict: symbol -> DataFrame (None when the fetch failed).
+        """
+        limit = int(max_concurrency or self.rate_limiter.max_connections)
+        sem = asyncio.Semaphore(max(1, limit))
+        symbols = list(symbols)
+
+        async def _fetch(sym):
+            async with sem:
+                return await self.get_historical_data_async(sym, exchange_segment, days)
+
+        results = await asyncio.gather(*(_fetch(s) for s in symbols), return_exceptions=True)
+
+        out = {}
+        for sym, res in zip(symbols, results):
+            if isinstance(res, Exception):
+                logger.error(f"Exception fetching history for {sym}: {res}")
+                res = None
+            out[sym] = res
+        return out
+
+    @staticmethod
+    def _bar_dates(df):
+        """IST session date of each daily bar (Dhan stamps bars with epoch seconds)."""
+        return pd.to_datetime(df["timestamp"], unit="s", utc=True).dt.tz_convert(IST).dt.date
+
+    def _bars_cache_file(self, symbol, exchange_segment) -> Path:
+        return self._bars_cache_dir / exchange_segment / f"{symbol}.parquet"
+
+    def _read_bars_cache(self, symbol, exchange_segment, start_date):
+        """Cached closed bars if they cover start_date onward, else None."""
+        if not _HAS_PYARROW:
+            return None
+        path = self._bars_cache_file(symbol, exchange_segment)
+        try:
+            if not path.exists():
+                return None
+            table = pq.read_table(path)
+            covered_from = (table.schema.metadata or {}).get(b"covered_from")
+            if not covered_from or date.fromisoformat(covered_from.decode()) > start_date:
+                return None
+            df = table.replace_schema_metadata(None).to_pandas()
+            return df if not df.empty else None
+        except Exception as e:
+            logger.debug(f"Bars cache read failed for {symbol}: {e}")
+            return None
+
+    def _write_bars_cache(self, symbol, exchange_segment, df, covered_from, today):
+        """Persist only sessions strictly before today (today's bar may still be forming)."""
+        if not _HAS_PYARROW or "timestamp" not in df.columns:
+            return
+        try:
+            closed = df[self._bar_dates(df) < today]
+            if closed.empty:
+                return
+            path = self._bars_cache_file(symbol, exchange_segment)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(closed, preserve_index=False)
+            table = table.replace_schema_metadata({"covered_from": covered_from.isoformat()})
+            tmp = path.with_suffix(".tmp")
+            pq.write_table(table, tmp)
+            tmp.replace(path)
+        except Exception as e:
+            logger.debug(f"Bars cache write failed for {symbol}: {e}")
+
+    def get_historical_data(self, symbol, exchange_segment="NSE_EQ", days=15, raise_on_error=False):
+        """
+        Fetches historical data for the last N days with rate limiting.
+
+        Unmapped symbols and bars served from the on-disk cache never take a
+        rate-limiter token; only actual REST calls are paced.
+
+        Returns None when there is nothing to return. With raise_on_error=True, failures
+        of the API itself (transport errors, persistent rate limiting, HTTP errors other
+        than per-symbol input/no-data codes) raise HistoryFetchError instead.
+        """
         if not self.is_connected:
             return None
 
@@ -737,6 +1160,14 @@ class DhanClientWrapper:
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=days)
 
+            # Serve closed sessions from the on-disk cache; fetch only what came after them
+            cached = self._read_bars_cache(symbol, exchange_segment, start_date)
+            fetch_from = start_date
+            if cached is not None:
+                fetch_from = self._bar_dates(cached).max() + timedelta(days=1)
+                if fetch_from >= end_date or not np.busday_count(fetch_from, end_date):
+                    return cached[self._bar_dates(cached) >= start_date].reset_index(drop=True)
+
             def _is_server_rate_limit(resp) -> bool:
                 if not isinstance(resp, dict):
                     return False
@@ -755,6 +1186,17 @@ class DhanClientWrapper:
                     return True
                 return False
 
+            def _is_data_error(resp) -> bool:
+                # The SDK reports transport/parse failures with a plain-string remarks;
+                # an HTTP error body carries a dict with the Dhan error code.
+                if not isinstance(resp, dict):
+                    return False
+                remarks = resp.get("remarks")
+                if not isinstance(remarks, dict):
+                    return False
+                code = remarks.get("error_code") or (resp.get("data") or {}).get("errorCode")
+                return str(code).strip().upper() in HISTORY_DATA_ERROR_CODES
+
             attempt = 0
             backoff_seconds = 1.0
             max_attempts = 12
@@ -767,26 +1209,27 @@ class DhanClientWrapper:
                     logger.error(f"Rate limiter could not acquire token for {symbol}")
                     return None
 
-                # Acquire connection slot
-                self.rate_limiter.acquire_connection()
-
                 try:
-                    # DEBUG: Log what we're about to send
-                    logger.debug(
-                        f"Fetching history for {symbol}: security_id={security_id} (type={type(security_id).__name__})"
-                    )
+                    # Hold a connection slot only for the request itself
+                    with self.rate_limiter.connection():
+                        # DEBUG: Log what we're about to send
+                        logger.debug(
+                            f"Fetching history for {symbol}: security_id={security_id} (type={type(security_id).__name__})"
+                        )
 
-                    response = self.dhan.historical_daily_data(
-                        security_id=str(security_id),  # SDK expects string
-                        exchange_segment=exchange_segment,  # Use string like "NSE_EQ"
-                        instrument_type="EQUITY",
-                        from_date=start_date.strftime("%Y-%m-%d"),
-                        to_date=end_date.strftime("%Y-%m-%d"),
-                    )
+                        response = self.dhan.historical_daily_data(
+                            security_id=str(security_id),  # SDK expects string
+                            exchange_segment=exchange_segment,  # Use string like "NSE_EQ"
+                            instrument_type="EQUITY",
+                            from_date=fetch_from.strftime("%Y-%m-%d"),
+                            to_date=end_date.strftime("%Y-%m-%d"),
+                        )
                 except Exception as e:
                     # Treat transient transport errors as retryable (bounded)
                     if attempt >= max_attempts:
                         logger.error(f"Exception fetching history for {symbol} (attempt {attempt}): {e}")
+                        if raise_on_error:
+                            raise HistoryFetchError(str(e)) from e
                         return None
                     sleep_for = min(10.0, backoff_seconds)
                     logger.warning(
@@ -796,24 +1239,29 @@ class DhanClientWrapper:
                     time.sleep(sleep_for)
                     backoff_seconds = min(20.0, backoff_seconds * 2.0)
                     continue
-                finally:
-                    # Always release connection (if not already released in exception path)
-                    try:
-                        self.rate_limiter.release_connection()
-                    except Exception:
-                        pass
 
                 if isinstance(response, dict) and response.get("status") == "success":
-                    data = response.get("data")
-                    return pd.DataFrame(data)
+                    df = pd.DataFrame(response.get("data"))
+                    if cached is not None:
+                        df = (
+                            pd.concat([cached, df], ignore_index=True)
+                            .drop_duplicates("timestamp", keep="last")
+                            .sort_values("timestamp", ignore_index=True)
+                        )
+                    self._write_bars_cache(symbol, exchange_segment, df, start_date, end_date)
+                    if cached is not None:
+                        df = df[self._bar_dates(df) >= start_date].reset_index(drop=True)
+                    return df
 
                 if _is_server_rate_limit(response):
                     if attempt >= max_attempts:
                         logger.error(f"Server rate-limit persists for {symbol} after {attempt} attempts: {response}")
+                        if raise_on_error:
+                            raise HistoryFetchError(f"rate limited: {response}")
                         return None
 
                     # Penalize limiter and retry with backoff.
-                    effective_now = self.rate_limiter._effective_rps(time.time())
+                    effective_now = self.rate_limiter._effective_rps(time.monotonic())
                     penalty_rps = max(0.5, float(effective_now) * 0.7)
                     self.rate_limiter.penalize(cooldown_seconds=60.0, penalty_rps=penalty_rps)
 
@@ -827,9 +1275,17 @@ class DhanClientWrapper:
                     backoff_seconds = min(20.0, backoff_seconds * 2.0)
                     continue
 
+                if cached is not None and _is_data_error(response):
+                    # Nothing new since the cached sessions (e.g. a holiday); serve the cache
+                    logger.debug(f"No new history for {symbol} since cache: {response}")
+                    return cached[self._bar_dates(cached) >= start_date].reset_index(drop=True)
                 logger.error(f"Failed to fetch history for {symbol}: {response}")
+                if raise_on_error and not _is_data_error(response):
+                    raise HistoryFetchError(str(response))
                 return None
-                
+
+        except HistoryFetchError:
+            raise
         except Exception as e:
             logger.error(f"Exception fetching history for {symbol}: {e}")
             return None
@@ -1052,20 +1508,18 @@ class DhanClientWrapper:
 
                 # Throttle REST calls too
                 self.rate_limiter.acquire(max_retries=None)
-                self.rate_limiter.acquire_connection()
                 try:
-                    response = self.dhan.ohlc_data({exchange_segment: batch})
+                    with self.rate_limiter.connection():
+                        response = self.dhan.ohlc_data({exchange_segment: batch})
                 except Exception as e:
                     response = {"status": "failure", "remarks": {"error_message": str(e)}}
-                finally:
-                    self.rate_limiter.release_connection()
 
                 if _is_server_rate_limit(response):
                     if attempt >= max_attempts:
                         logger.error(f"OHLC snapshot batch rate-limited after {attempt} attempts: {response}")
                         break
 
-                    effective_now = self.rate_limiter._effective_rps(time.time())
+                    effective_now = self.rate_limiter._effective_rps(time.monotonic())
                     penalty_rps = max(0.5, float(effective_now) * 0.7)
                     self.rate_limiter.penalize(cooldown_seconds=60.0, penalty_rps=penalty_rps)
 
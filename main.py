@@ -1,19 +1,33 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
 from pydantic import BaseModel
 import asyncio
+import gc
+import hashlib
 import json
 import logging
+import os
 import sys
+import tempfile
+import threading
 from pathlib import Path
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from datetime import timedelta
 
+import jinja2
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from config import StrategySettings
 from credentials_store import load_credentials, save_credentials
+import redis_store
 from dhan_client import DhanClientWrapper
 from strategy_engine import LadderEngine
 from performance_monitor import perf_monitor
@@ -46,11 +60,37 @@ class _DropNoisyAccessLog(logging.Filter):
 
 logging.getLogger("uvicorn.access").addFilter(_DropNoisyAccessLog())
 
-app = FastAPI(title="Dhan Ladder Algo")
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=_ORJSON_OPTS, default=str)
+else:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, default=str).encode("utf-8")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (numpy values and non-str keys allowed)."""
+
+    def render(self, content) -> bytes:
+        return _dumps(content)
+
+
+app = FastAPI(title="Dhan Ladder Algo", default_response_class=ORJSONResponse)
 
 # Mount Static & Templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Compiled template bytecode is cached on disk so restarts skip re-parsing index.html
+_jinja_cache_dir = os.path.join(tempfile.gettempdir(), "jinja_cache")
+os.makedirs(_jinja_cache_dir, exist_ok=True)
+templates = Jinja2Templates(
+    env=jinja2.Environment(
+        loader=jinja2.FileSystemLoader("templates"),
+        autoescape=True,
+        bytecode_cache=jinja2.FileSystemBytecodeCache(_jinja_cache_dir),
+    )
+)
 
 # Global Instances
 dhan = DhanClientWrapper()
@@ -59,63 +99,161 @@ engine = LadderEngine(dhan)
 # WebSocket Manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: set[WebSocket] = set()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+
+    async def broadcast(self, payload: bytes):
+        # Snapshot so connects/disconnects during the awaits don't mutate what we iterate.
+        connections = tuple(self.active_connections)
+        if not connections:
+            return
+
+        # Send to all clients concurrently; a slow client no longer delays the others.
+        results = await asyncio.gather(
+            *(conn.send_bytes(payload) for conn in connections),
+            return_exceptions=True,
+        )
 
-    async def broadcast(self, message: str):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"WebSocket send error: {e}")
-                disconnected.append(connection)
-        
         # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+        for conn, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"WebSocket send error: {result}")
+                self.disconnect(conn)
 
 manager = ConnectionManager()
 
-# Background Task for Push Updates
-async def broadcast_status():
+# Engine -> broadcaster wakeups. Engine threads enqueue at most one pending wakeup;
+# the broadcaster drains the queue and sends only the newest snapshot.
+_status_q: asyncio.Queue = asyncio.Queue()
+_status_wakeup_pending = threading.Event()
+_main_loop: asyncio.AbstractEventLoop | None = None
+
+BROADCAST_MIN_INTERVAL = 0.1  # cap push rate while the market is busy
+BROADCAST_HEARTBEAT = 0.5     # push at least this often (UI staleness detection)
+
+def _on_engine_state_change():
+    """Called from tick/order threads; wakes the broadcaster without a syscall per tick."""
+    loop = _main_loop
+    if loop is None or _status_wakeup_pending.is_set():
+        return
+    _status_wakeup_pending.set()
+    try:
+        loop.call_soon_threadsafe(_status_q.put_nowait, None)
+    except RuntimeError:
+        # Event loop closed (shutdown)
+        pass
+
+PERF_LOG_INTERVAL = 60      # seconds between performance log lines
+METRICS_PUSH_INTERVAL = 5   # seconds between "metrics" frames (slow UI panel)
+SYS_SAMPLE_INTERVAL = 5     # seconds between psutil samples
+
+# Background Task for Push Updates, performance logging and system sampling.
+# One task with a small timer wheel instead of a sleeping task per job.
+async def scheduler():
+    loop = asyncio.get_running_loop()
+    now = loop.time()
+    next_broadcast = now
+    next_log = now + PERF_LOG_INTERVAL
+    next_sample = now + SYS_SAMPLE_INTERVAL
+    next_metrics = now
+
+    # Snapshot caches keyed by engine.state_version: positions are rebuilt and the
+    # payload re-serialized only when something visible actually changed.
+    positions_version = None
+    positions = []
+    payload_key = None
+    payload = b""
     while True:
+        deadline = next_broadcast
+        if perf_monitor.enabled:
+            deadline = min(deadline, next_log, next_sample, next_metrics)
+        woken = False
+        timeout = deadline - loop.time()
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(_status_q.get(), timeout=timeout)
+                woken = True
+            except asyncio.TimeoutError:
+                pass
+
+        now = loop.time()
+        metrics = None
+        if perf_monitor.enabled:
+            if now >= next_sample:
+                perf_monitor.refresh_system_stats()
+                next_sample = now + SYS_SAMPLE_INTERVAL
+            if now >= next_log:
+                metrics = perf_monitor.get_all_metrics()
+                perf_monitor.log_metrics(metrics)
+                next_log = now + PERF_LOG_INTERVAL
+            if now >= next_metrics:
+                # Slow section: metrics/system stats on their own cadence and frame
+                if metrics is None:
+                    metrics = perf_monitor.get_all_metrics()
+                try:
+                    await manager.broadcast(_dumps({"type": "metrics", "performance": metrics}))
+                except Exception as e:
+                    logger.error(f"Metrics broadcast error: {e}")
+                next_metrics = now + METRICS_PUSH_INTERVAL
+
+        if not (woken or now >= next_broadcast):
+            continue
+
+        # Coalesce: everything queued so far is covered by the snapshot built below.
+        _status_wakeup_pending.clear()
+        while not _status_q.empty():
+            _status_q.get_nowait()
+
         try:
-            positions = [
-                s.dict()
-                for s in engine.active_stocks.values()
-                if s.mode != "NONE" or str(getattr(s, "status", "")).startswith("PENDING")
-            ]
-            # Construct Status JSON (keep payload small for smooth UI)
-            status_data = {
-                "positions": positions,
-                "active_positions": len(positions),
-                "total_stocks": len(engine.active_stocks),
-                "global_pnl": engine.pnl_global,
-                "is_running": engine.running,
-                "armed_for_market_open": getattr(engine, "armed_for_market_open", False),
-                "dhan_connected": dhan.is_connected,
-                "market_open": engine.is_market_hours(),
-                "performance": perf_monitor.get_all_metrics() if perf_monitor.enabled else {}
-            }
-            await manager.broadcast(json.dumps(status_data))
+            version = engine.state_version
+            if version != positions_version:
+                positions = [
+                    v
+                    for v in engine.refresh_active_stocks_view().values()
+                    if v["mode"] != "NONE" or str(v["status"]).startswith("PENDING")
+                ]
+                positions_version = version
+
+            armed = getattr(engine, "armed_for_market_open", False)
+            market_open = engine.is_market_hours()
+            key = (version, dhan.is_connected, market_open, armed)
+            if key != payload_key:
+                # Construct Status JSON (fast section only; keep payload small for smooth UI)
+                status_data = {
+                    "type": "positions",
+                    "positions": positions,
+                    "active_positions": len(positions),
+                    "total_stocks": len(engine.active_stocks),
+                    "global_pnl": engine.pnl_global,
+                    "is_running": engine.running,
+                    "armed_for_market_open": armed,
+                    "dhan_connected": dhan.is_connected,
+                    "market_open": market_open,
+                }
+                payload = _dumps(status_data)
+                payload_key = key
+            await manager.broadcast(payload)
         except Exception as e:
             logger.error(f"Broadcast error: {e}")
-        await asyncio.sleep(0.5)  # 2 updates/sec keeps UI smooth
+        next_broadcast = loop.time() + BROADCAST_HEARTBEAT
+        await asyncio.sleep(BROADCAST_MIN_INTERVAL)
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(broadcast_status())
-    # Start performance logging
-    if perf_monitor.enabled:
-        asyncio.create_task(perf_monitor.periodic_logging(interval_seconds=60))
+    global _main_loop
+    _main_loop = asyncio.get_running_loop()
+    engine.set_state_listener(_on_engine_state_change)
+    # Status broadcast + performance logging/sampling share one scheduler task
+    asyncio.create_task(scheduler())
+
+    # Collect gen0 less often: the tick/broadcast paths allocate mostly short-lived dicts.
+    gc.set_threshold(50_000, 10, 10)
 
     async def _warmup():
         """Preload cached resources (security master, filtered candidates)."""
@@ -130,6 +268,11 @@ async def startup_event():
         except Exception as e:
             logger.error(f"Warmup: filtered stocks load failed: {e}")
 
+        # Security master and candidate stocks are loaded now: move them (with the app and
+        # engine) to the permanent generation so cyclic GC stops rescanning them.
+        gc.collect()
+        gc.freeze()
+
     async def _auto_start_at_market_open():
         """Arm and start engine right at 09:15 IST if configured/armed."""
         while True:
@@ -176,7 +319,7 @@ async def startup_event():
 
     # Auto-connect if saved credentials exist (do not block app startup)
     async def _auto_connect_saved():
-        saved_client_id, saved_access_token = load_credentials()
+        saved_client_id, saved_access_token = await asyncio.to_thread(load_credentials)
         if not (saved_client_id and saved_access_token) or dhan.is_connected:
             return
 
@@ -202,6 +345,23 @@ async def startup_event():
     asyncio.create_task(_auto_connect_saved())
     asyncio.create_task(_auto_start_at_market_open())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    redis_store.close()
+
+# Rendered dashboard, keyed by app.js version: (app_js_version, html, etag)
+_dashboard_cache = None
+
+def _render_dashboard(app_js_version: int):
+    global _dashboard_cache
+    cached = _dashboard_cache
+    if cached is not None and cached[0] == app_js_version:
+        return cached
+    html = templates.get_template("index.html").render({"request": None, "app_js_version": app_js_version})
+    etag = '"' + hashlib.sha1(html.encode("utf-8")).hexdigest() + '"'
+    _dashboard_cache = (app_js_version, html, etag)
+    return _dashboard_cache
+
 # Routes
 @app.get("/")
 async def get_dashboard(request: Request):
@@ -210,20 +370,24 @@ async def get_dashboard(request: Request):
         app_js_version = int(Path("static/app.js").stat().st_mtime_ns)
     except Exception:
         app_js_version = int(datetime.now().timestamp())
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "app_js_version": app_js_version},
-    )
+    # Template only changes with the app.js cache-buster; re-render just then.
+    _, html, etag = _render_dashboard(app_js_version)
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return HTMLResponse(status_code=304, headers=headers)
+    return HTMLResponse(html, headers=headers)
 
 @app.post("/api/login")
 async def login_dhan(settings: StrategySettings):
     """Connect to Dhan API and update credentials."""
     # Skip slow security-master prefetch; it will be fetched lazily on subscribe/top-movers.
-    success, msg = dhan.connect(settings.client_id, settings.access_token, False)
+    success, msg = await asyncio.to_thread(
+        dhan.connect, settings.client_id, settings.access_token, False
+    )
     if success:
         engine.update_settings(settings)
-        save_credentials(settings.client_id, settings.access_token)
-    return {"success": success, "message": msg}
+        await asyncio.to_thread(save_credentials, settings.client_id, settings.access_token)
+    return ORJSONResponse(content={"success": success, "message": msg})
 
 @app.post("/api/settings")
 async def update_settings(settings: StrategySettings):
@@ -242,20 +406,20 @@ async def update_settings(settings: StrategySettings):
     msg = "Settings saved"
     if dhan.is_connected:
         msg = "Settings saved and Dhan connected"
-    return {"status": "success", "message": msg, "settings": settings.dict()}
+    return ORJSONResponse(content={"status": "success", "message": msg, "settings": settings.model_dump(mode="json")})
 
 @app.post("/api/warmup")
 async def warmup():
     """Warm up cached resources (security master, filtered candidates)."""
     if not dhan.is_connected:
-        return {"status": "error", "message": "Dhan not connected"}
+        return ORJSONResponse(content={"status": "error", "message": "Dhan not connected"})
     try:
         await asyncio.to_thread(dhan.ensure_security_mapping_loaded)
         await asyncio.to_thread(engine.load_filtered_stocks)
-        return {"status": "success", "message": "Warmup complete"}
+        return ORJSONResponse(content={"status": "success", "message": "Warmup complete"})
     except Exception as e:
         logger.error(f"Warmup failed: {e}", exc_info=True)
-        return {"status": "error", "message": str(e)}
+        return ORJSONResponse(content={"status": "error", "message": str(e)})
 
 @app.get("/api/cache/warm/status", include_in_schema=False)
 async def cache_warm_status_compat():
@@ -263,11 +427,11 @@ async def cache_warm_status_compat():
     Compatibility endpoint for older frontends/tools that used to poll this path.
     Backtesting is removed; keep this to avoid noisy 404s.
     """
-    return {
+    return ORJSONResponse(content={
         "status": "deprecated",
         "message": "Deprecated endpoint. Use /api/status and /api/warmup.",
         "dhan_connected": dhan.is_connected,
-    }
+    })
 
 @app.post("/api/start")
 async def start_engine():
@@ -275,148 +439,149 @@ async def start_engine():
     try:
         if not dhan.is_connected:
             logger.error("Cannot start engine: Dhan not connected")
-            return {"status": "error", "message": "Dhan not connected. Please login first."}
+            return ORJSONResponse(content={"status": "error", "message": "Dhan not connected. Please login first."})
 
         if engine.running:
             logger.warning("Engine already running")
-            return {"status": "already_running", "message": "Engine is already running"}
+            return ORJSONResponse(content={"status": "already_running", "message": "Engine is already running"})
 
         if not engine.is_market_hours():
             engine.armed_for_market_open = True
-            return {
+            return ORJSONResponse(content={
                 "status": "armed",
                 "message": "Market closed (IST). Engine armed; will auto-start at 09:15 IST.",
-            }
+            })
 
         # Ensure we have candidates, otherwise the engine will start and immediately stop.
         candidates_map = engine.load_filtered_stocks()
         if not candidates_map:
-            return {
+            return ORJSONResponse(content={
                 "status": "error",
                 "message": "No filtered stocks available. Run premarket_filter.py first.",
-            }
+            })
 
         logger.info("Starting strategy engine...")
         asyncio.create_task(engine.start_strategy())
-        return {"status": "success", "message": "Engine started successfully"}
+        return ORJSONResponse(content={"status": "success", "message": "Engine started successfully"})
 
     except Exception as e:
         logger.error(f"Failed to start engine: {e}", exc_info=True)
-        return {"status": "error", "message": f"Failed to start: {str(e)}"}
+        return ORJSONResponse(content={"status": "error", "message": f"Failed to start: {str(e)}"})
 
 @app.post("/api/stop")
 async def stop_engine():
     """Stop the trading engine."""
     engine.stop("Stopped by user")
     dhan.stop_feed()
-    return {"status": "Stopped"}
+    return ORJSONResponse(content={"status": "Stopped"})
 
 @app.get("/api/status")
 async def get_status():
     """Get current system status."""
-    return {
+    return ORJSONResponse(content={
         "dhan_connected": dhan.is_connected,
         "engine_running": engine.running,
-        "active_positions": len([s for s in engine.active_stocks.values() if s.mode != "NONE"]),
+        "active_positions": sum(1 for s in tuple(engine.active_stocks.values()) if s.mode != "NONE"),
         "total_stocks": len(engine.active_stocks),
         "global_pnl": engine.pnl_global,
         "market_open": engine.is_market_hours()
-    }
+    })
 
 @app.get("/api/positions")
 async def get_positions():
     """Get current positions from Dhan."""
     if not dhan.is_connected:
-        return {"status": "error", "message": "Not connected"}
+        return ORJSONResponse(content={"status": "error", "message": "Not connected"})
     
-    positions = dhan.get_positions()
-    return {"status": "success", "positions": positions}
+    positions = await asyncio.to_thread(dhan.get_positions)
+    return ORJSONResponse(content={"status": "success", "positions": positions})
 
 @app.post("/api/square-off-all")
 async def emergency_square_off():
     """Emergency square-off all positions."""
     if not dhan.is_connected:
-        return {"status": "error", "message": "Not connected"}
+        return ORJSONResponse(content={"status": "error", "message": "Not connected"})
     
     try:
         await engine.square_off_all()
-        return {"status": "success", "message": "Square-off queued"}
+        return ORJSONResponse(content={"status": "success", "message": "Square-off queued"})
     except Exception as e:
         logger.error(f"Square-off failed: {e}")
-        return {"status": "error", "message": str(e)}
+        return ORJSONResponse(content={"status": "error", "message": str(e)})
 
 @app.post("/api/close-position/{symbol}")
 async def close_single_position(symbol: str):
     """Close/square-off a specific ladder (compat endpoint)."""
     if symbol not in engine.active_stocks:
-        return {"status": "error", "message": "Stock not found"}
+        return ORJSONResponse(content={"status": "error", "message": "Stock not found"})
     
     stock = engine.active_stocks[symbol]
     if stock.mode == "NONE":
-        return {"status": "error", "message": "No active position"}
+        return ORJSONResponse(content={"status": "error", "message": "No active position"})
     
     try:
         engine.square_off_symbol(symbol, reason="Manual Square-off", final_status="CLOSED_MANUAL")
-        return {"status": "success", "message": f"{symbol} square-off queued"}
+        return ORJSONResponse(content={"status": "success", "message": f"{symbol} square-off queued"})
     except Exception as e:
         logger.error(f"Failed to close {symbol}: {e}")
-        return {"status": "error", "message": str(e)}
+        return ORJSONResponse(content={"status": "error", "message": str(e)})
 
 @app.post("/api/square-off/{symbol}")
 async def square_off_symbol(symbol: str):
     """Square-off all positions for a single ladder and mark it closed."""
     if symbol not in engine.active_stocks:
-        return {"status": "error", "message": "Stock not found"}
+        return ORJSONResponse(content={"status": "error", "message": "Stock not found"})
     stock = engine.active_stocks[symbol]
     if stock.mode == "NONE":
-        return {"status": "error", "message": "No active position"}
+        return ORJSONResponse(content={"status": "error", "message": "No active position"})
     try:
         engine.square_off_symbol(symbol, reason="Manual Square-off", final_status="CLOSED_MANUAL")
-        return {"status": "success", "message": f"{symbol} square-off queued"}
+        return ORJSONResponse(content={"status": "success", "message": f"{symbol} square-off queued"})
     except Exception as e:
         logger.error(f"Square-off failed for {symbol}: {e}")
-        return {"status": "error", "message": str(e)}
+        return ORJSONResponse(content={"status": "error", "message": str(e)})
 
 @app.get("/api/metrics")
 async def get_metrics():
     """Get performance metrics."""
-    return {
+    return ORJSONResponse(content={
         "status": "success",
         "metrics": perf_monitor.get_all_metrics(),
         "order_summary": engine.order_manager.get_summary()
-    }
+    })
 
 @app.get("/api/top-movers")
 async def get_top_movers():
     """Fetch top gainers/losers via REST for closed market or fallback."""
     if not dhan.is_connected:
-        return {"status": "error", "message": "Not connected"}
+        return ORJSONResponse(content={"status": "error", "message": "Not connected"})
 
     # Prefer filtered candidates if available
-    candidates_map = engine.load_filtered_stocks()
+    candidates_map = await asyncio.to_thread(engine.load_filtered_stocks)
     symbols = list(candidates_map.keys()) if candidates_map else STOCK_LIST
 
-    result = dhan.get_top_movers(
+    result = await asyncio.to_thread(
+        dhan.get_top_movers,
         symbols,
         top_n_gainers=engine.settings.top_n_gainers,
         top_n_losers=engine.settings.top_n_losers,
         exchange_segment="NSE_EQ",
     )
-    return {
+    return ORJSONResponse(content={
         "status": "success",
         "gainers": result.get("gainers", []),
         "losers": result.get("losers", []),
         "errors": result.get("errors", []),
-    }
+    })
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint."""
-    return {
+    return ORJSONResponse(content={
         "status": "healthy",
         "dhan_connected": dhan.is_connected,
         "engine_running": engine.running
-    }
+    })
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
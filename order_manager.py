@@ -6,7 +6,7 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class Order:
     """Represents a single order."""
     order_id: str
@@ -17,7 +17,7 @@ class Order:
     status: str = "PENDING"  # PENDING, EXECUTED, REJECTED, CANCELLED
     executed_price: float = 0.0
     executed_quantity: int = 0
-    timestamp: float = field(default_factory=time.time)
+    timestamp: int = field(default_factory=time.monotonic_ns)  # creation order (monotonic ns)
     retry_count: int = 0
     error_message: str = ""
     
@@ -28,9 +28,36 @@ class OrderManager:
         self.dhan_client = dhan_client
         self.orders: Dict[str, Order] = {}  # order_id -> Order
         self.stock_orders: Dict[str, List[str]] = {}  # symbol -> [order_ids]
+        self._order_index: Dict[str, int] = {}  # order_id -> position in stock_orders[symbol]
         self.max_retries = 3
         self.retry_delay_seconds = 1
+
+        # Running per-status counts and id indexes (kept in sync on every state change)
+        self._counts: Dict[str, int] = {"PENDING": 0, "EXECUTED": 0, "REJECTED": 0, "CANCELLED": 0}
+        self._pending_ids: set[str] = set()
+        self._rejected_ids: set[str] = set()
+        # Executed fill aggregates: (symbol, BUY|SELL) -> (total_value, total_qty)
+        self._agg: Dict[tuple, tuple] = {}
+
+    def _index_status(self, order_id: str, status: str, delta: int):
+        """Add (delta=1) or remove (delta=-1) an order from the status counters/indexes."""
+        self._counts[status] = self._counts.get(status, 0) + delta
+        ids = self._pending_ids if status == "PENDING" else self._rejected_ids if status == "REJECTED" else None
+        if ids is not None:
+            if delta > 0:
+                ids.add(order_id)
+            else:
+                ids.discard(order_id)
         
+    def _apply_fill(self, order: Order, sign: int):
+        """Add (sign=1) or remove (sign=-1) an executed order's fill from the aggregates."""
+        key = (order.symbol, order.transaction_type)
+        value, qty = self._agg.get(key, (0.0, 0))
+        self._agg[key] = (
+            value + sign * order.executed_price * order.executed_quantity,
+            qty + sign * order.executed_quantity,
+        )
+
     def create_order(self, symbol: str, transaction_type: str, quantity: int, 
                      order_type: str = "MARKET") -> Optional[Order]:
         """Create and track a new order."""
@@ -46,11 +73,18 @@ class OrderManager:
                 order_type=order_type
             )
             
+            replaced = self.orders.get(temp_order_id)
+            if replaced is not None:
+                self._index_status(temp_order_id, replaced.status, -1)
+                if replaced.status == "EXECUTED":
+                    self._apply_fill(replaced, -1)
             self.orders[temp_order_id] = order
+            self._index_status(temp_order_id, order.status, 1)
             
             # Track by symbol
             if symbol not in self.stock_orders:
                 self.stock_orders[symbol] = []
+            self._order_index[temp_order_id] = len(self.stock_orders[symbol])
             self.stock_orders[symbol].append(temp_order_id)
             
             return order
@@ -66,10 +100,16 @@ class OrderManager:
         """Update order status after execution attempt."""
         if order_id in self.orders:
             order = self.orders[order_id]
+            if order.status == "EXECUTED":
+                self._apply_fill(order, -1)
+            self._index_status(order_id, order.status, -1)
+            self._index_status(order_id, status, 1)
             order.status = status
             order.executed_price = executed_price
             order.executed_quantity = executed_quantity
             order.error_message = error_message
+            if status == "EXECUTED":
+                self._apply_fill(order, 1)
             
             logger.info(f"Order {order_id} updated: {status}")
             
@@ -78,13 +118,22 @@ class OrderManager:
         if temp_id in self.orders:
             order = self.orders.pop(temp_id)
             order.order_id = actual_id
+            replaced = self.orders.get(actual_id)
+            if replaced is not None:
+                self._index_status(actual_id, replaced.status, -1)
+                if replaced.status == "EXECUTED":
+                    self._apply_fill(replaced, -1)
             self.orders[actual_id] = order
+            self._index_status(temp_id, order.status, -1)
+            self._index_status(actual_id, order.status, 1)
             
             # Update stock_orders mapping
             symbol = order.symbol
-            if symbol in self.stock_orders and temp_id in self.stock_orders[symbol]:
-                idx = self.stock_orders[symbol].index(temp_id)
-                self.stock_orders[symbol][idx] = actual_id
+            idx = self._order_index.pop(temp_id, None)
+            ids = self.stock_orders.get(symbol)
+            if ids is not None and idx is not None and idx < len(ids) and ids[idx] == temp_id:
+                ids[idx] = actual_id
+                self._order_index[actual_id] = idx
                 
     def get_stock_orders(self, symbol: str) -> List[Order]:
         """Get all orders for a specific stock."""
@@ -101,27 +150,12 @@ class OrderManager:
         
     def calculate_average_entry(self, symbol: str, transaction_type: str) -> float:
         """Calculate average entry price for a position."""
-        executed_orders = [
-            o for o in self.get_executed_orders(symbol)
-            if o.transaction_type == transaction_type
-        ]
-        
-        if not executed_orders:
-            return 0.0
-            
-        total_value = sum(o.executed_price * o.executed_quantity for o in executed_orders)
-        total_quantity = sum(o.executed_quantity for o in executed_orders)
-        
+        total_value, total_quantity = self._agg.get((symbol, transaction_type), (0.0, 0))
         return total_value / total_quantity if total_quantity > 0 else 0.0
         
     def get_total_quantity(self, symbol: str, transaction_type: str) -> int:
         """Get total executed quantity for a position."""
-        executed_orders = [
-            o for o in self.get_executed_orders(symbol)
-            if o.transaction_type == transaction_type
-        ]
-        
-        return sum(o.executed_quantity for o in executed_orders)
+        return self._agg.get((symbol, transaction_type), (0.0, 0))[1]
         
     def should_retry_order(self, order_id: str) -> bool:
         """Check if order should be retried."""
@@ -139,27 +173,31 @@ class OrderManager:
             
     def get_pending_orders(self) -> List[Order]:
         """Get all pending orders."""
-        return [o for o in self.orders.values() if o.status == "PENDING"]
+        return [self.orders[oid] for oid in self._pending_ids]
         
     def get_failed_orders(self) -> List[Order]:
         """Get all failed/rejected orders."""
-        return [o for o in self.orders.values() if o.status == "REJECTED"]
+        return [self.orders[oid] for oid in self._rejected_ids]
         
     def clear_stock_orders(self, symbol: str):
         """Clear all orders for a stock (used when position is fully closed)."""
         if symbol in self.stock_orders:
             order_ids = self.stock_orders[symbol]
             for oid in order_ids:
+                self._order_index.pop(oid, None)
                 if oid in self.orders:
+                    self._index_status(oid, self.orders[oid].status, -1)
                     del self.orders[oid]
             del self.stock_orders[symbol]
+            self._agg.pop((symbol, "BUY"), None)
+            self._agg.pop((symbol, "SELL"), None)
             
     def get_summary(self) -> Dict:
         """Get order summary statistics."""
         total = len(self.orders)
-        executed = len([o for o in self.orders.values() if o.status == "EXECUTED"])
-        pending = len([o for o in self.orders.values() if o.status == "PENDING"])
-        rejected = len([o for o in self.orders.values() if o.status == "REJECTED"])
+        executed = self._counts.get("EXECUTED", 0)
+        pending = self._counts.get("PENDING", 0)
+        rejected = self._counts.get("REJECTED", 0)
         
         return {
             "total_orders": total,
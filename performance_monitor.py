@@ -3,36 +3,104 @@ import logging
 import psutil
 from collections import deque
 from typing import Dict, List
-import asyncio
+import threading
 
 logger = logging.getLogger(__name__)
 
+class RollingWindow:
+    """Fixed-size sliding window with O(1) sum/min/max (monotonic deques for min/max)."""
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._values = deque(maxlen=maxlen)
+        self._sum = 0
+        self._seq = 0  # index of the next appended value
+        self._min = deque()  # (seq, value), values increasing
+        self._max = deque()  # (seq, value), values decreasing
+        # Ticks are recorded on the feed thread while stats are read on the event loop
+        self._lock = threading.Lock()
+
+    def append(self, value: float):
+        with self._lock:
+            self._append(value)
+
+    def _append(self, value: float):
+        if len(self._values) == self.maxlen:
+            self._sum -= self._values[0]
+        self._values.append(value)
+        self._sum += value
+
+        seq = self._seq
+        self._seq += 1
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+
+        # Drop extremes that slid out of the window
+        oldest = seq - self.maxlen
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+
+        # Re-sum once per window to stop floating-point drift accumulating
+        if self._seq % self.maxlen == 0:
+            self._sum = sum(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def stats(self):
+        """Return (mean, min, max) of the current window (window must be non-empty)."""
+        with self._lock:
+            return self._sum / len(self._values), self._min[0][1], self._max[0][1]
+
+
 class PerformanceMonitor:
     """Monitors and tracks performance metrics for low-latency trading."""
     
     def __init__(self, enabled: bool = True):
         self.enabled = enabled
-        self.tick_latencies = deque(maxlen=1000)  # Last 1000 tick latencies
-        self.order_latencies = deque(maxlen=100)  # Last 100 order latencies
+        # Latencies are stored as integer nanoseconds; converted to ms only when reported
+        self.tick_latencies = RollingWindow(maxlen=1000)  # Last 1000 tick latencies
+        self.order_latencies = RollingWindow(maxlen=100)  # Last 100 order latencies
         self.tick_count = 0
         self.order_count = 0
         self.start_time = time.time()
-        self.last_tick_time = time.time()
+        self._start_ns = time.monotonic_ns()
+        self.last_tick_ns = self._start_ns
+
+        # psutil handle reused across samples; the first cpu_percent(None) call only
+        # primes the counter, later ones return usage since the previous call.
+        self._proc = psutil.Process()
+        self._proc.cpu_percent(None)
+        self._last_sys_stats = self._sample_system_stats()
         
-    def record_tick_latency(self, latency_ms: float):
-        """Record tick processing latency in milliseconds."""
+    def record_tick_latency_ns(self, elapsed_ns: int):
+        """Record tick processing latency in nanoseconds (perf_counter_ns deltas)."""
         if not self.enabled:
             return
-        self.tick_latencies.append(latency_ms)
+        self.tick_latencies.append(elapsed_ns)
         self.tick_count += 1
-        self.last_tick_time = time.time()
-        
-    def record_order_latency(self, latency_ms: float):
-        """Record order execution latency in milliseconds."""
+        self.last_tick_ns = time.monotonic_ns()
+
+    def record_tick_latency(self, latency_ms: float):
+        """Record tick processing latency in milliseconds."""
+        self.record_tick_latency_ns(round(latency_ms * 1_000_000))
+
+    def record_order_latency_ns(self, elapsed_ns: int):
+        """Record order execution latency in nanoseconds (perf_counter_ns deltas)."""
         if not self.enabled:
             return
-        self.order_latencies.append(latency_ms)
+        self.order_latencies.append(elapsed_ns)
         self.order_count += 1
+
+    def record_order_latency(self, latency_ms: float):
+        """Record order execution latency in milliseconds."""
+        self.record_order_latency_ns(round(latency_ms * 1_000_000))
         
     def get_tick_stats(self) -> Dict:
         """Get tick processing statistics."""
@@ -44,13 +112,13 @@ class PerformanceMonitor:
                 "tick_rate": 0
             }
         
-        latencies = list(self.tick_latencies)
-        tick_rate = self.tick_count / max(1, time.time() - self.start_time)
+        avg, lo, hi = self.tick_latencies.stats()
+        tick_rate = self.tick_count / max(1, (time.monotonic_ns() - self._start_ns) / 1e9)
         
         return {
-            "avg_latency_ms": sum(latencies) / len(latencies),
-            "min_latency_ms": min(latencies),
-            "max_latency_ms": max(latencies),
+            "avg_latency_ms": avg / 1e6,
+            "min_latency_ms": lo / 1e6,
+            "max_latency_ms": hi / 1e6,
             "tick_rate": tick_rate,
             "total_ticks": self.tick_count
         }
@@ -65,24 +133,35 @@ class PerformanceMonitor:
                 "total_orders": 0
             }
         
-        latencies = list(self.order_latencies)
+        avg, lo, hi = self.order_latencies.stats()
         
         return {
-            "avg_latency_ms": sum(latencies) / len(latencies),
-            "min_latency_ms": min(latencies),
-            "max_latency_ms": max(latencies),
+            "avg_latency_ms": avg / 1e6,
+            "min_latency_ms": lo / 1e6,
+            "max_latency_ms": hi / 1e6,
             "total_orders": self.order_count
         }
         
-    def get_system_stats(self) -> Dict:
-        """Get system resource usage."""
-        process = psutil.Process()
+    def _sample_system_stats(self) -> Dict:
+        """Take a non-blocking resource sample of this process."""
+        process = self._proc
         
         return {
-            "cpu_percent": process.cpu_percent(interval=0.1),
+            "cpu_percent": process.cpu_percent(None),
             "memory_mb": process.memory_info().rss / 1024 / 1024,
             "threads": process.num_threads()
         }
+
+    def get_system_stats(self) -> Dict:
+        """Get system resource usage (last sample from refresh_system_stats)."""
+        return self._last_sys_stats
+
+    def refresh_system_stats(self):
+        """Refresh the cached system resource sample (non-blocking)."""
+        try:
+            self._last_sys_stats = self._sample_system_stats()
+        except Exception as e:
+            logger.debug(f"System stats sample failed: {e}")
         
     def get_all_metrics(self) -> Dict:
         """Get all performance metrics."""
@@ -90,15 +169,16 @@ class PerformanceMonitor:
             "tick_stats": self.get_tick_stats(),
             "order_stats": self.get_order_stats(),
             "system_stats": self.get_system_stats(),
-            "uptime_seconds": time.time() - self.start_time
+            "uptime_seconds": (time.monotonic_ns() - self._start_ns) / 1e9
         }
         
-    def log_metrics(self):
-        """Log current performance metrics."""
+    def log_metrics(self, metrics: Dict = None):
+        """Log current performance metrics (pass already-collected metrics to reuse them)."""
         if not self.enabled:
             return
             
-        metrics = self.get_all_metrics()
+        if metrics is None:
+            metrics = self.get_all_metrics()
         logger.info(
             f"Performance Metrics - "
             f"Tick Avg: {metrics['tick_stats']['avg_latency_ms']:.2f}ms, "
@@ -106,12 +186,6 @@ class PerformanceMonitor:
             f"CPU: {metrics['system_stats']['cpu_percent']:.1f}%, "
             f"Memory: {metrics['system_stats']['memory_mb']:.1f}MB"
         )
-        
-    async def periodic_logging(self, interval_seconds: int = 60):
-        """Periodically log performance metrics."""
-        while True:
-            await asyncio.sleep(interval_seconds)
-            self.log_metrics()
 
 # Global instance
 perf_monitor = PerformanceMonitor()
@@ -13,12 +13,25 @@ import json
 import logging
 import argparse
 import hashlib
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Tuple, Optional, Iterable, List
-from dhan_client import DhanClientWrapper
+
+try:
+    import orjson
+
+    def _dumps(payload) -> bytes:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps(payload) -> bytes:
+        return json.dumps(payload, indent=2).encode("utf-8")
+from dhan_client import DhanClientWrapper, HistoryFetchError
 from credentials_store import load_credentials
-from redis_store import save_candidates, load_candidates
-from strategy_engine import STOCK_LIST
+from redis_store import save_candidates, load_candidates, publish_premarket_progress
+from strategy_engine import STOCK_LIST, STOCK_SET, STOCK_LIST_SIGNATURE
 
 # Setup logging (IST timestamps)
 from zoneinfo import ZoneInfo
@@ -42,6 +55,24 @@ logger = logging.getLogger(__name__)
 VOLUME_SMA_THRESHOLD = 2000
 VOLUME_SMA_DIVISOR = 1875
 REQUIRED_DAYS = 5
+# Calendar-day lookback requested from the API (one request whatever its length).
+# Fifteen days span at least ten weekdays, so REQUIRED_DAYS sessions survive two
+# weekends plus a multi-holiday week (e.g. Diwali).
+HIST_FETCH_DAYS = REQUIRED_DAYS * 2 + 5
+
+PROGRESS_LOG_INTERVAL = 1.0  # seconds between aggregated progress lines
+
+# Circuit breaker: stop hitting the API after this many consecutive transport/HTTP
+# failures (unmapped or no-data symbols don't count), then let one probe through
+# once the cool-off has passed
+BREAKER_THRESHOLD = 20
+BREAKER_COOLOFF_SECONDS = 30.0
+
+# Accepted rows are appended here while screening (crash-safe partial output)
+PARTIAL_RESULTS_PATH = "filtered_stocks.partial.jsonl"
+
+# Single publisher thread: progress events go out in order and never take fetch threads
+_progress_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="premarket-progress")
 
 
 def _stock_list_signature(symbols: Iterable[str]) -> Tuple[int, str]:
@@ -64,13 +95,46 @@ def _normalize_symbol(symbol: str) -> str:
 class PremarketFilter:
     """Handles premarket stock filtration based on volume SMA."""
     
-    def __init__(self, dhan_client: Optional[DhanClientWrapper] = None, verbose: bool = False):
+    def __init__(
+        self,
+        dhan_client: Optional[DhanClientWrapper] = None,
+        verbose: bool = False,
+        publish_progress: bool = False,
+    ):
         self.dhan_client = dhan_client
         self.verbose = verbose
+        # Publish per-stock accept/reject events on Redis pub/sub while screening
+        self.publish_progress = publish_progress
         self._last_total_screened: Optional[int] = None
         self._last_stock_list_count: Optional[int] = None
         self._last_stock_list_hash: Optional[str] = None
         self._last_volume_sma_by_symbol: Dict[str, float] = {}
+        self._last_partial_path: Optional[str] = None
+        self._consecutive_errors = 0
+        self._breaker_open = False
+        self._breaker_opened_at = 0.0
+        self._breaker_probe_in_flight = False
+        self._breaker_threshold = BREAKER_THRESHOLD
+        self.breaker_tripped = False  # set once the breaker opened during a run
+
+    def _record_fetch(self, ok: bool):
+        """Track consecutive fetch failures and open/close the circuit breaker."""
+        if ok:
+            self._consecutive_errors = 0
+            if self._breaker_open:
+                self._breaker_open = False
+                logger.info("Dhan API responding again; circuit breaker closed")
+            return
+        self._consecutive_errors += 1
+        if self._consecutive_errors >= self._breaker_threshold:
+            if not self._breaker_open:
+                logger.error(
+                    f"{self._consecutive_errors} consecutive history fetches failed; "
+                    f"circuit breaker open (remaining stocks skipped, probe in {BREAKER_COOLOFF_SECONDS:.0f}s)"
+                )
+            self._breaker_open = True
+            self._breaker_opened_at = time.monotonic()
+            self.breaker_tripped = True
         
     async def filter_single_stock(self, symbol: str) -> Optional[Tuple[str, float, float]]:
         """
@@ -86,27 +150,45 @@ class PremarketFilter:
             if self.dhan_client is None:
                 raise RuntimeError("Dhan client not initialized (cannot filter stocks).")
 
+            probe = False
+            if self._breaker_open:
+                # Half-open after the cool-off: exactly one task probes, the rest keep skipping
+                if (
+                    self._breaker_probe_in_flight
+                    or time.monotonic() - self._breaker_opened_at < BREAKER_COOLOFF_SECONDS
+                ):
+                    return None
+                self._breaker_probe_in_flight = probe = True
+
             # Fetch historical data
-            df = await self.dhan_client.get_historical_data_async(symbol, days=15)
+            try:
+                df = await self.dhan_client.get_historical_data_async(
+                    symbol, days=HIST_FETCH_DAYS, raise_on_error=True
+                )
+            except HistoryFetchError:
+                self._record_fetch(False)
+                raise
+            finally:
+                if probe:
+                    self._breaker_probe_in_flight = False
+            # Any answer from the API (data, or a per-symbol "no data") counts as healthy
+            self._record_fetch(True)
             
             if df is None or df.empty or len(df) < REQUIRED_DAYS:
                 logger.debug(f"REJECTED {symbol}: Insufficient data")
                 return None
                 
-            # Get last 5 days
-            last_5_days = df.tail(REQUIRED_DAYS)
-            
-            if 'volume' not in last_5_days.columns:
+            if 'volume' not in df.columns:
                 logger.debug(f"REJECTED {symbol}: No volume data")
                 return None
                 
-            # Calculate volume SMA
-            total_volume_5d = last_5_days['volume'].sum()
-            volume_sma = total_volume_5d / VOLUME_SMA_DIVISOR
+            # Calculate volume SMA over the last REQUIRED_DAYS sessions (plain NumPy slices)
+            volume = df['volume'].to_numpy()
+            volume_sma = volume[-REQUIRED_DAYS:].sum() / VOLUME_SMA_DIVISOR
             
             # Apply filter
             if volume_sma > VOLUME_SMA_THRESHOLD:
-                prev_close = float(df.iloc[-1]['close'])
+                prev_close = float(df['close'].to_numpy()[-1])
                 if self.verbose:
                     logger.info(
                         f"ACCEPTED {symbol}: VolSMA={volume_sma:.2f}, PrevClose={prev_close:.2f}"
@@ -124,6 +206,7 @@ class PremarketFilter:
         self,
         symbols: Optional[Iterable[str]] = None,
         max_in_flight: int = 20,
+        partial_path: Optional[str] = None,
     ) -> Dict[str, float]:
         """
         Filter all stocks using concurrent processing.
@@ -131,6 +214,8 @@ class PremarketFilter:
         Args:
             symbols: Iterable of symbols to process (defaults to STOCK_LIST)
             max_in_flight: Max concurrent in-flight tasks (threadpool-bound)
+            partial_path: JSONL file accepted rows are appended to as they arrive
+                (None, the default, disables it); save_to_json removes it after the final write
         
         Returns:
             Dictionary mapping accepted symbols to their previous close prices
@@ -147,6 +232,7 @@ class PremarketFilter:
         total_stocks = len(symbols_list)
         sig_count, sig_hash = _stock_list_signature(symbols_list)
         self._last_total_screened = total_stocks
+        self.breaker_tripped = False
         self._last_stock_list_count = sig_count
         self._last_stock_list_hash = sig_hash
 
@@ -160,34 +246,59 @@ class PremarketFilter:
 
         semaphore = asyncio.Semaphore(max(1, int(max_in_flight)))
         completed = 0
+        last_report = time.monotonic()
+        loop = asyncio.get_running_loop()
 
         async def _run_one(sym: str):
             async with semaphore:
-                return await self.filter_single_stock(sym)
+                return sym, await self.filter_single_stock(sym)
 
         tasks = [asyncio.create_task(_run_one(sym)) for sym in symbols_list]
-        for fut in asyncio.as_completed(tasks):
-            result = await fut
-            completed += 1
-
-            if result and isinstance(result, tuple):
-                sym, prev_close, volume_sma = result
-                accepted_stocks[sym] = prev_close
+        partial_file = open(partial_path, "w", buffering=1) if partial_path else nullcontext()
+        with partial_file as partial:
+            for fut in asyncio.as_completed(tasks):
+                # One failing symbol must not abort the whole screen (gather return_exceptions semantics)
                 try:
-                    accepted_volume_sma[sym] = float(volume_sma)
-                except Exception:
-                    pass
-
-            if completed % 25 == 0 or completed == total_stocks:
-                progress = (completed / total_stocks) * 100
-                logger.info(
-                    f"[{completed}/{total_stocks}] ({progress:.1f}%) "
-                    f"Accepted={len(accepted_stocks)}"
-                )
+                    symbol, result = await fut
+                except Exception as e:
+                    logger.error(f"ERROR in filtration task: {e}")
+                    symbol, result = None, None
+                completed += 1
+
+                if self.publish_progress and symbol is not None:
+                    # Fire-and-forget; screening never waits on Redis
+                    loop.run_in_executor(_progress_executor, publish_premarket_progress, {
+                        "symbol": symbol,
+                        "accepted": bool(result),
+                        "prev_close": result[1] if result else None,
+                        "idx": completed,
+                        "total": total_stocks,
+                    })
+
+                if result and isinstance(result, tuple):
+                    sym, prev_close, volume_sma = result
+                    accepted_stocks[sym] = prev_close
+                    try:
+                        accepted_volume_sma[sym] = float(volume_sma)
+                    except Exception:
+                        pass
+                    if partial is not None:
+                        partial.write(json.dumps({"symbol": sym, "prev_close": prev_close}) + "\n")
+
+                # One aggregated line per interval, however fast results arrive
+                now = time.monotonic()
+                if completed == total_stocks or now - last_report >= PROGRESS_LOG_INTERVAL:
+                    last_report = now
+                    progress = (completed / total_stocks) * 100
+                    logger.info(
+                        f"[{completed}/{total_stocks}] ({progress:.1f}%) "
+                        f"Accepted={len(accepted_stocks)}"
+                    )
         
         logger.info("=" * 70)
         logger.info(f"Filtration Complete: {len(accepted_stocks)} / {total_stocks} stocks accepted")
         self._last_volume_sma_by_symbol = dict(accepted_volume_sma)
+        self._last_partial_path = partial_path
         return accepted_stocks
     
     def save_to_json(
@@ -251,8 +362,17 @@ class PremarketFilter:
                 data["stock_list_count"] = count
                 data["stock_list_hash"] = digest
         
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Write-then-rename so readers never see a half-written file
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_dumps(data))
+        os.replace(tmp_path, filepath)
+        if self._last_partial_path:
+            try:
+                os.remove(self._last_partial_path)
+            except OSError:
+                pass
+            self._last_partial_path = None
         
         logger.info(f"Saved {len(candidates)} candidates to {filepath}")
         
@@ -285,18 +405,14 @@ async def main():
     if args.in_flight <= 0:
         parser.error("--in-flight must be > 0")
     
-    # Load credentials
-    import os
-    from getpass import getpass
-    
     # If we already have today's candidates in Redis, reuse by default.
     if not args.force:
-        cached = load_candidates()
+        cached = await asyncio.to_thread(load_candidates)
         if cached and cached.get("candidates"):
             # Guardrail: never allow cached candidates outside current STOCK_LIST.
-            stock_set = {_normalize_symbol(s) for s in STOCK_LIST}
+            stock_set = STOCK_SET
 
-            current_count, current_hash = _stock_list_signature(STOCK_LIST)
+            current_count, current_hash = STOCK_LIST_SIGNATURE
             cached_count = cached.get("stock_list_count")
             cached_hash = cached.get("stock_list_hash")
 
@@ -334,7 +450,7 @@ async def main():
                         f"Use --force to rescreen {len(STOCK_LIST)} stocks."
                     )
                     pf = PremarketFilter(verbose=args.verbose)
-                    pf.save_to_json(candidates, metadata=cached, save_redis=False)
+                    await asyncio.to_thread(pf.save_to_json, candidates, metadata=cached, save_redis=False)
                     return
             else:
                 # Legacy cache (no stock list signature). Only reuse if it's fully compatible.
@@ -364,7 +480,7 @@ async def main():
                     upgraded_meta["stock_list_count"] = current_count
                     upgraded_meta["stock_list_hash"] = current_hash
                     pf = PremarketFilter(verbose=args.verbose)
-                    pf.save_to_json(candidates, metadata=upgraded_meta, save_redis=True)
+                    await asyncio.to_thread(pf.save_to_json, candidates, metadata=upgraded_meta, save_redis=True)
                     return
 
     # Only require credentials if we're going to recompute.
@@ -374,25 +490,16 @@ async def main():
 
     # If not in env, try saved credentials file
     if not client_id or not access_token:
-        saved_client_id, saved_access_token = load_credentials()
+        saved_client_id, saved_access_token = await asyncio.to_thread(load_credentials)
         client_id = client_id or saved_client_id
         access_token = access_token or saved_access_token
 
-    # If still missing, prompt user
+    # No interactive prompt here (main stays fully async); fail fast instead
     if not client_id or not access_token:
-        logger.info("\nDhan API Credentials Required")
-        logger.info("You can set DHAN_CLIENT_ID and DHAN_ACCESS_TOKEN environment variables")
-        logger.info("or save credentials once from the web app and re-run:")
-        logger.info("  - Click 'Save Settings' after entering credentials")
-        logger.info("or enter them now:\n")
-
-        if not client_id:
-            client_id = input("Enter Dhan Client ID: ").strip()
-        if not access_token:
-            access_token = getpass("Enter Dhan Access Token: ").strip()
-
-    if not client_id or not access_token:
-        logger.error("Credentials are required. Exiting.")
+        logger.error("Dhan API credentials are required. Exiting.")
+        logger.error("Set DHAN_CLIENT_ID and DHAN_ACCESS_TOKEN environment variables,")
+        logger.error("save them once from the web app ('Save Settings'),")
+        logger.error("or run: python setup_credentials.py")
         return
 
     # Initialize Dhan client (tuned for historical API rate limits)
@@ -417,12 +524,23 @@ async def main():
         logger.error("Failed to load security master mapping. Cannot run filtration.")
         return
     
-    # Run filtration
-    filter_engine = PremarketFilter(dhan_client, verbose=args.verbose)
-    candidates = await filter_engine.filter_all_stocks(max_in_flight=int(args.in_flight))
+    # Run filtration (pooled connections are released when the block exits)
+    filter_engine = PremarketFilter(dhan_client, verbose=args.verbose, publish_progress=True)
+    async with dhan_client:
+        candidates = await filter_engine.filter_all_stocks(
+            max_in_flight=int(args.in_flight), partial_path=PARTIAL_RESULTS_PATH
+        )
     
+    if filter_engine.breaker_tripped:
+        # Don't publish a partial screen as today's candidates (it would be reused all day)
+        logger.error(
+            "Screening was cut short by repeated Dhan API failures; results not saved. "
+            "Fix the connection/credentials and re-run."
+        )
+        return
+
     # Save results
-    filter_engine.save_to_json(candidates)
+    await asyncio.to_thread(filter_engine.save_to_json, candidates)
     
     # Print summary
     logger.info("=" * 70)
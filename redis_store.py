@@ -1,17 +1,49 @@
 import json
 import logging
 import os
+import time
 from datetime import datetime, time as dt_time, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Optional, Tuple
 from zoneinfo import ZoneInfo
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 IST = ZoneInfo("Asia/Kolkata")
 DEFAULT_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 
+LATEST_CANDIDATES_KEY = "dhan:premarket:candidates:latest"
+PREMARKET_PROGRESS_CHANNEL = "dhan:premarket:progress"
+
+_REDIS = None
+
+if orjson is not None:
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+else:
+    def _dumps(obj) -> str:
+        return json.dumps(obj)
+
+    _loads = json.loads
+
+# Small in-process read cache: key -> (expires_at_monotonic, value)
+_cache: Dict[str, Tuple[float, Any]] = {}
+CANDIDATES_CACHE_TTL = 30.0
+CREDENTIALS_CACHE_TTL = float("inf")  # until the next save_credentials()
+
+
 def _get_redis_client():
+    global _REDIS
+    if _REDIS is not None:
+        return _REDIS
+
     try:
         import redis
     except Exception as e:
@@ -19,21 +51,85 @@ def _get_redis_client():
         return None
 
     try:
-        return redis.Redis.from_url(DEFAULT_REDIS_URL, decode_responses=True)
+        # One client (and its connection pool) for the whole process
+        _REDIS = redis.Redis.from_url(
+            DEFAULT_REDIS_URL,
+            decode_responses=True,
+            socket_keepalive=True,
+            health_check_interval=30,
+        )
+        return _REDIS
     except Exception as e:
         logger.warning(f"Failed to connect to Redis at {DEFAULT_REDIS_URL}: {e}")
         return None
 
 
+def close() -> None:
+    """Close the shared client and release its pooled connections."""
+    global _REDIS
+    r, _REDIS = _REDIS, None
+    if r is not None:
+        try:
+            r.close()
+        except Exception:
+            pass
+
+
+def _ttl_get(key: str, ttl: float, loader: Callable[[], Any], empty: Any = None) -> Any:
+    """Return a cached value younger than ttl, else call loader (empty results are not cached)."""
+    hit = _cache.get(key)
+    now = time.monotonic()
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    value = loader()
+    if value != empty:
+        _cache[key] = (now + ttl, value)
+    return value
+
+
+# Epoch of the upcoming 23:59:59 IST; recomputed only once it has passed (day rollover)
+_eod_epoch: Optional[float] = None
+
+
 def _seconds_until_end_of_day_ist() -> int:
-    now = datetime.now(IST)
-    end = datetime.combine(now.date(), dt_time(23, 59, 59), IST)
-    if now >= end:
-        end = end + timedelta(days=1)
-    return int((end - now).total_seconds())
+    global _eod_epoch
+    now = time.time()
+    if _eod_epoch is None or now >= _eod_epoch:
+        today = datetime.fromtimestamp(now, IST)
+        end = datetime.combine(today.date(), dt_time(23, 59, 59), IST)
+        if today >= end:
+            end = end + timedelta(days=1)
+        _eod_epoch = end.timestamp()
+    return max(1, int(_eod_epoch - now))
+
+
+# (next IST midnight epoch, "YYYYMMDD") and (epoch second, ISO timestamp)
+_today_cache: Optional[Tuple[float, str]] = None
+_iso_cache: Optional[Tuple[int, str]] = None
+
+
+def _today_str() -> str:
+    """Today's IST date as YYYYMMDD; the tz conversion runs once per day."""
+    global _today_cache
+    now = time.time()
+    if _today_cache is None or now >= _today_cache[0]:
+        today = datetime.fromtimestamp(now, IST)
+        midnight = datetime.combine(today.date() + timedelta(days=1), dt_time(0, 0), IST)
+        _today_cache = (midnight.timestamp(), today.strftime("%Y%m%d"))
+    return _today_cache[1]
+
+
+def _now_iso() -> str:
+    """Current IST time as ISO-8601 (second precision), formatted once per second."""
+    global _iso_cache
+    second = int(time.time())
+    if _iso_cache is None or _iso_cache[0] != second:
+        _iso_cache = (second, datetime.fromtimestamp(second, IST).isoformat())
+    return _iso_cache[1]
 
 
 def save_credentials(client_id: str, access_token: str) -> bool:
+    _cache.pop("creds", None)
     r = _get_redis_client()
     if not r:
         return False
@@ -41,7 +137,7 @@ def save_credentials(client_id: str, access_token: str) -> bool:
         r.hset("dhan:credentials", mapping={
             "client_id": client_id,
             "access_token": access_token,
-            "saved_at": datetime.now(IST).isoformat(),
+            "saved_at": _now_iso(),
         })
         return True
     except Exception as e:
@@ -50,6 +146,10 @@ def save_credentials(client_id: str, access_token: str) -> bool:
 
 
 def load_credentials() -> Tuple[Optional[str], Optional[str]]:
+    return _ttl_get("creds", CREDENTIALS_CACHE_TTL, _load_credentials_uncached, empty=(None, None))
+
+
+def _load_credentials_uncached() -> Tuple[Optional[str], Optional[str]]:
     r = _get_redis_client()
     if not r:
         return None, None
@@ -62,26 +162,53 @@ def load_credentials() -> Tuple[Optional[str], Optional[str]]:
         return None, None
 
 
+_CANDIDATE_META_FIELDS = (
+    "timestamp",
+    "criteria",
+    "total_stocks_screened",
+    "stocks_accepted",
+    "stock_list_count",
+    "stock_list_hash",
+    "volume_sma_by_symbol",
+)
+
+
+def _meta_key(candidates_key: str) -> str:
+    return f"{candidates_key}:meta"
+
+
 def save_candidates(candidates: Dict[str, float], metadata: Dict) -> bool:
+    """
+    Store the day's candidates as a hash (symbol -> prev_close) plus a sibling
+    metadata hash (field -> JSON value), so a single symbol can be read with HGET.
+    """
+    _cache.pop("cands", None)
     r = _get_redis_client()
     if not r:
         return False
     try:
-        today_key = f"dhan:premarket:candidates:{datetime.now(IST).strftime('%Y%m%d')}"
-        payload = {
-            "timestamp": metadata.get("timestamp"),
-            "criteria": metadata.get("criteria"),
-            "total_stocks_screened": metadata.get("total_stocks_screened"),
-            "stocks_accepted": metadata.get("stocks_accepted"),
-            "stock_list_count": metadata.get("stock_list_count"),
-            "stock_list_hash": metadata.get("stock_list_hash"),
-            "candidates": candidates,
+        today_key = f"dhan:premarket:candidates:{_today_str()}"
+        meta_key = _meta_key(today_key)
+        meta = {
+            field: _dumps(metadata.get(field))
+            for field in _CANDIDATE_META_FIELDS
+            if metadata.get(field) is not None
         }
-        if isinstance(metadata.get("volume_sma_by_symbol"), dict) and metadata.get("volume_sma_by_symbol"):
-            payload["volume_sma_by_symbol"] = metadata.get("volume_sma_by_symbol")
-        r.set(today_key, json.dumps(payload))
-        r.set("dhan:premarket:candidates:latest", today_key)
-        r.expire(today_key, _seconds_until_end_of_day_ist())
+        if not metadata.get("volume_sma_by_symbol"):
+            meta.pop("volume_sma_by_symbol", None)
+        ttl = _seconds_until_end_of_day_ist()
+
+        # One round trip; DEL first so a rerun (or an old JSON string value) is fully replaced
+        pipe = r.pipeline(transaction=False)
+        pipe.delete(today_key, meta_key)
+        if candidates:
+            pipe.hset(today_key, mapping={sym: str(pc) for sym, pc in candidates.items()})
+            pipe.expire(today_key, ttl)
+        if meta:
+            pipe.hset(meta_key, mapping=meta)
+            pipe.expire(meta_key, ttl)
+        pipe.set(LATEST_CANDIDATES_KEY, today_key)
+        pipe.execute()
         return True
     except Exception as e:
         logger.warning(f"Failed to save candidates to Redis: {e}")
@@ -89,16 +216,63 @@ def save_candidates(candidates: Dict[str, float], metadata: Dict) -> bool:
 
 
 def load_candidates() -> Optional[Dict]:
+    return _ttl_get("cands", CANDIDATES_CACHE_TTL, _load_candidates_uncached)
+
+
+def invalidate_candidates_cache() -> None:
+    """Drop the in-process candidates entry (e.g. after another process reran premarket)."""
+    _cache.pop("cands", None)
+
+
+def _load_candidates_uncached() -> Optional[Dict]:
     r = _get_redis_client()
     if not r:
         return None
     try:
-        latest_key = r.get("dhan:premarket:candidates:latest")
+        latest_key = r.get(LATEST_CANDIDATES_KEY)
         if not latest_key:
             return None
-        raw = r.get(latest_key)
-        if not raw:
+        if r.type(latest_key) == "string":
+            # Saved by an older version as one JSON blob
+            raw = r.get(latest_key)
+            return _loads(raw) if raw else None
+
+        pipe = r.pipeline(transaction=False)
+        pipe.hgetall(_meta_key(latest_key))
+        pipe.hgetall(latest_key)
+        meta, members = pipe.execute()
+        if not meta and not members:
+            return None
+        payload = {field: _loads(value) for field, value in meta.items()}
+        payload["candidates"] = {sym: float(pc) for sym, pc in members.items()}
+        return payload
+    except Exception:
+        return None
+
+
+def publish_premarket_progress(event: Dict) -> bool:
+    """Publish one screening event ({symbol, accepted, idx, total, ...}) to subscribers."""
+    r = _get_redis_client()
+    if not r:
+        return False
+    try:
+        r.publish(PREMARKET_PROGRESS_CHANNEL, _dumps(event))
+        return True
+    except Exception as e:
+        logger.debug(f"Failed to publish premarket progress: {e}")
+        return False
+
+
+def load_candidate(symbol: str) -> Optional[float]:
+    """Previous close for one of today's candidates, or None if it was not accepted."""
+    r = _get_redis_client()
+    if not r:
+        return None
+    try:
+        latest_key = r.get(LATEST_CANDIDATES_KEY)
+        if not latest_key:
             return None
-        return json.loads(raw)
+        value = r.hget(latest_key, symbol)
+        return float(value) if value is not None else None
     except Exception:
         return None
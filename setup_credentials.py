@@ -0,0 +1,28 @@
+"""
+Save Dhan API credentials for premarket_filter.py and the web app.
+
+Usage:
+    python setup_credentials.py
+"""
+
+from getpass import getpass
+
+from credentials_store import CREDENTIALS_FILE, load_credentials, save_credentials
+
+
+def main():
+    saved_client_id, _ = load_credentials()
+    prompt = f"Enter Dhan Client ID [{saved_client_id}]: " if saved_client_id else "Enter Dhan Client ID: "
+    client_id = input(prompt).strip() or (saved_client_id or "")
+    access_token = getpass("Enter Dhan Access Token: ").strip()
+
+    if not client_id or not access_token:
+        print("Both client ID and access token are required. Nothing saved.")
+        return
+
+    save_credentials(client_id, access_token)
+    print(f"Credentials saved (Redis when available, and {CREDENTIALS_FILE}).")
+
+
+if __name__ == "__main__":
+    main()
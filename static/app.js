@@ -282,8 +282,25 @@ function formatTurnover(value) {
     return (value / 10000000).toFixed(2) + ' Cr';
 }
 
+function updatePerformance(performance) {
+    if (!(performance && performance.tick_stats)) {
+        return;
+    }
+    const tickStats = performance.tick_stats;
+    const orderStats = performance.order_stats;
+    const systemStats = performance.system_stats;
+
+    document.getElementById('tickLatency').textContent = tickStats.avg_latency_ms.toFixed(2) + 'ms';
+    document.getElementById('orderLatency').textContent = orderStats.avg_latency_ms.toFixed(2) + 'ms';
+    document.getElementById('tickRate').textContent = tickStats.tick_rate.toFixed(0) + '/s';
+    document.getElementById('cpuUsage').textContent = systemStats.cpu_percent.toFixed(1) + '%';
+    document.getElementById('memoryUsage').textContent = systemStats.memory_mb.toFixed(1) + 'MB';
+    document.getElementById('latency').textContent = tickStats.avg_latency_ms.toFixed(1);
+}
+
 // WebSocket with reconnection
 let ws;
+const wsTextDecoder = new TextDecoder();
 let wsReconnectTimer;
 let lastTopMoversFetch = 0;
 let marketOpenState = null;
@@ -342,6 +359,8 @@ function connectWebSocket() {
     }
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
+    // Status frames are binary (UTF-8 JSON bytes); receive them as ArrayBuffer.
+    ws.binaryType = 'arraybuffer';
 
     ws.onopen = function () {
         wsReconnectAttempts = 0;
@@ -353,7 +372,14 @@ function connectWebSocket() {
 
     ws.onmessage = function (event) {
         lastMessageTime = Date.now();
-        const data = JSON.parse(event.data);
+        const raw = typeof event.data === 'string' ? event.data : wsTextDecoder.decode(event.data);
+        const data = JSON.parse(raw);
+
+        // Slow section: metrics frames arrive on their own (longer) cadence
+        if (data.type === 'metrics') {
+            updatePerformance(data.performance);
+            return;
+        }
 
         // Update Global Stats
         globalPnlEl.textContent = formatCurrency(data.global_pnl);
@@ -367,19 +393,8 @@ function connectWebSocket() {
         document.getElementById('activeLadders').textContent = activeCount;
         document.getElementById('totalStocks').textContent = totalStocks;
 
-        // Update performance metrics
-        if (data.performance && data.performance.tick_stats) {
-            const tickStats = data.performance.tick_stats;
-            const orderStats = data.performance.order_stats;
-            const systemStats = data.performance.system_stats;
-
-            document.getElementById('tickLatency').textContent = tickStats.avg_latency_ms.toFixed(2) + 'ms';
-            document.getElementById('orderLatency').textContent = orderStats.avg_latency_ms.toFixed(2) + 'ms';
-            document.getElementById('tickRate').textContent = tickStats.tick_rate.toFixed(0) + '/s';
-            document.getElementById('cpuUsage').textContent = systemStats.cpu_percent.toFixed(1) + '%';
-            document.getElementById('memoryUsage').textContent = systemStats.memory_mb.toFixed(1) + 'MB';
-            document.getElementById('latency').textContent = tickStats.avg_latency_ms.toFixed(1);
-        }
+        // Update performance metrics (older servers embed them in every frame)
+        updatePerformance(data.performance);
 
         // When market is closed, fetch top movers via REST
         marketOpenState = data.market_open;
@@ -1,12 +1,15 @@
 import asyncio
 import json
 import logging
+import math
 import os
 import queue
 import threading
 import time
+from time import perf_counter_ns
 import hashlib
 from collections import Counter
+from operator import attrgetter
 from config import StrategySettings, StockStatus
 from dhan_client import DhanClientWrapper
 from order_manager import OrderManager
@@ -14,12 +17,25 @@ from performance_monitor import perf_monitor
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Iterable, Tuple
-from datetime import datetime, time as dt_time
+from datetime import datetime, time as dt_time, timedelta
 from zoneinfo import ZoneInfo
-from redis_store import load_candidates
+from redis_store import invalidate_candidates_cache, load_candidates
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 IST = ZoneInfo("Asia/Kolkata")
+CRORE = 10000000  # INR per crore (min_turnover_crores -> rupees)
+
+# StockStatus fields a tick (and the trading logic it drives) can change and the UI shows;
+# process_tick only notifies when one of them actually moved.
+_tick_visible_fields = attrgetter(
+    "ltp", "last_volume", "turnover", "change_pct", "day_open", "high_watermark", "pnl",
+    "status", "mode", "quantity", "ladder_level", "stop_loss", "target", "pending_order",
+)
 
 def _stock_list_signature(symbols: Iterable[str]) -> Tuple[int, str]:
     normalized = [str(s).strip().upper() for s in symbols if str(s).strip()]
@@ -28,7 +44,7 @@ def _stock_list_signature(symbols: Iterable[str]) -> Tuple[int, str]:
     return len(unique_sorted), hashlib.sha256(payload).hexdigest()
 
 
-STOCK_LIST = [
+STOCK_LIST = (
   "MRF","3MINDIA","HONAUT","ABBOTINDIA","JSWHL","POWERINDIA","PTCIL","FORCEMOT","NEULANDLAB","LMW",
   "TVSHLTD","MAHSCOOTER","ZFCVINDIA","PGHH","BAJAJHLDNG","DYNAMATECH","ASTRAZEN","APARINDS","GILLETTE",
   "WENDT","TASTYBITE","VOLTAMP","CRAFTSMAN","NSIL","ESABINDIA","NAVINFLUOR","ICRA","LINDEINDIA","ATUL",
@@ -183,7 +199,11 @@ STOCK_LIST = [
   "ANIKINDS","RKEC","ROSSELLIND","VMSTMT","UJJIVANSFB","FILATEX","ELGIRUBCO","RADIANTCMS","BODALCHEM",
   "PASUPTAC","BYKE","GOLDTECH","LLOYDSENGG","ONEPOINT","KARMAENG","TARMAT","VIDYAWIRES","MEDICO",
   "BLKASHYAP","AMJLAND","AHLADA","AMDIND","ROML","TEXMOPIPES"
-]
+)
+# Normalized universe for O(1) membership and its signature, computed once at import
+STOCK_SET = frozenset(str(sym).strip().upper() for sym in STOCK_LIST)
+STOCK_LIST_SIGNATURE = _stock_list_signature(STOCK_LIST)
+
 class LadderEngine:
     def __init__(self, dhan_client: DhanClientWrapper):
         self.dhan_client = dhan_client
@@ -192,6 +212,8 @@ class LadderEngine:
         self.active_stocks: Dict[str, StockStatus] = {}
         self.started_symbols = set()
         self.armed_for_market_open = False
+        # (next IST midnight, market open, market close) as epoch seconds
+        self._market_window: Tuple[float, float, float] | None = None
         self.running = False
         self.pnl_global = 0.0
         self.trading_halted = False
@@ -218,10 +240,123 @@ class LadderEngine:
         self._pending_start_symbols: set[str] = set()
         self._order_generation = 0
         self._ensure_order_workers()
+
+        # Bumped on every UI-visible mutation (active_stocks, pnl_global, running) so
+        # consumers can reuse a cached snapshot while it is unchanged.
+        self.state_version = 0
+        # Optional zero-arg hook fired (from tick/order threads) when UI-visible state changes
+        self._state_listener = None
+
+        # Plain-dict mirror of active_stocks for the UI; only symbols touched since the
+        # last refresh are re-dumped (see refresh_active_stocks_view).
+        self.active_stocks_view: Dict[str, dict] = {}
+        self._view_lock = threading.Lock()
+        self._view_dirty: set[str] = set()
+        self._view_all_dirty = True
+
+        # Struct-of-arrays mirror of the tick-driven market fields, indexed by sym_idx.
+        # StockStatus stays the source of truth; process_tick writes both, and the
+        # selection scan filters on the arrays instead of walking every object.
+        self._soa_src = None
+        self._soa_stocks: Tuple[StockStatus, ...] = ()
+        self.symbols = np.empty(0, dtype=object)
+        self.sym_idx: Dict[str, int] = {}
+        self.ltp_arr = np.zeros(0)
+        self.prev_close_arr = np.zeros(0)
+        self.change_pct_arr = np.zeros(0)
+        self.turnover_arr = np.zeros(0)
         
         # Pre-calculate multipliers
         self._update_multipliers()
 
+    def set_state_listener(self, listener) -> None:
+        """Register a zero-arg callable invoked whenever UI-visible engine state changes."""
+        self._state_listener = listener
+
+    def _notify_state_change(self, symbol: str | None = None, *, all_stocks: bool = False) -> None:
+        """Mark changed stock(s) for the view, bump state_version, and wake the listener."""
+        # Dirty-mark first: a reader that sees the new version must also see the mark,
+        # otherwise it caches that version against a view missing this change.
+        if symbol is not None or all_stocks:
+            with self._view_lock:
+                if all_stocks:
+                    self._view_all_dirty = True
+                else:
+                    self._view_dirty.add(symbol)
+        self.state_version += 1
+        listener = self._state_listener
+        if listener is None:
+            return
+        try:
+            listener()
+        except Exception as e:
+            logger.debug(f"State listener error: {e}")
+
+    def refresh_active_stocks_view(self) -> Dict[str, dict]:
+        """Bring active_stocks_view up to date (re-dumping only changed stocks) and return it."""
+        with self._view_lock:
+            all_dirty = self._view_all_dirty
+            dirty = self._view_dirty
+            self._view_all_dirty = False
+            self._view_dirty = set()
+
+        if all_dirty:
+            self.active_stocks_view = {
+                sym: stock.to_dict() for sym, stock in list(self.active_stocks.items())
+            }
+            return self.active_stocks_view
+
+        view = self.active_stocks_view
+        for sym in dirty:
+            stock = self.active_stocks.get(sym)
+            if stock is None:
+                view.pop(sym, None)
+            else:
+                view[sym] = stock.to_dict()
+        return view
+
+    def _rebuild_tick_arrays(self) -> None:
+        """(Re)build the SoA mirror from active_stocks (on start, or when the dict was replaced)."""
+        src = self.active_stocks
+        items = tuple(src.items())
+        n = len(items)
+        stocks = tuple(stock for _, stock in items)
+        self.symbols = np.array([sym for sym, _ in items], dtype=object)
+        self.sym_idx = {sym: i for i, (sym, _) in enumerate(items)}
+        self.ltp_arr = np.fromiter((s.ltp for s in stocks), dtype=np.float64, count=n)
+        self.prev_close_arr = np.fromiter((s.prev_close for s in stocks), dtype=np.float64, count=n)
+        self.change_pct_arr = np.fromiter((s.change_pct for s in stocks), dtype=np.float64, count=n)
+        self.turnover_arr = np.fromiter((s.turnover for s in stocks), dtype=np.float64, count=n)
+        self._soa_stocks = stocks
+        self._soa_src = src
+
+    def _ensure_tick_arrays(self, check_entries: bool = False) -> None:
+        """
+        Rebuild the SoA mirror if active_stocks was replaced or resized. With check_entries,
+        also rebuild when a StockStatus was swapped in place (O(n); for throttled callers).
+        """
+        src = self.active_stocks
+        if self._soa_src is not src or len(self._soa_stocks) != len(src):
+            self._rebuild_tick_arrays()
+        elif check_entries and any(a is not b for a, b in zip(self._soa_stocks, src.values())):
+            self._rebuild_tick_arrays()
+
+    def _set_market_fields(self, stock: StockStatus, ltp: float, turnover: float, change_pct: float) -> None:
+        """Single write path for ltp/turnover/change_pct: updates the stock and its SoA slot."""
+        stock.ltp = ltp
+        stock.turnover = turnover
+        stock.change_pct = change_pct
+        i = self.sym_idx.get(stock.symbol)
+        if i is not None and self._soa_stocks[i] is stock:
+            self.ltp_arr[i] = ltp
+            self.turnover_arr[i] = turnover
+            self.change_pct_arr[i] = change_pct
+
+    def _stocks_tuple(self) -> Tuple[StockStatus, ...]:
+        """Persistent tuple of tracked stocks (rebuilt with the SoA mirror when active_stocks changes)."""
+        self._ensure_tick_arrays()
+        return self._soa_stocks
+
     def _get_stock_lock(self, symbol: str) -> threading.RLock:
         lock = self._stock_locks.get(symbol)
         if lock is None:
@@ -271,6 +406,7 @@ class LadderEngine:
                 if task.get("kind") == "STOP":
                     return
                 self._execute_order_task(task)
+                self._notify_state_change(task.get("symbol"))
             except Exception as e:
                 logger.error(f"Order worker error: {e}", exc_info=True)
             finally:
@@ -294,6 +430,7 @@ class LadderEngine:
     def _mark_pending(self, stock: StockStatus, pending: str):
         stock.pending_order = pending
         stock.last_order_error = ""
+        self._notify_state_change(stock.symbol)
 
     def _clear_pending(self, stock: StockStatus):
         stock.pending_order = ""
@@ -308,7 +445,7 @@ class LadderEngine:
                 order_type="MARKET",
             )
 
-        start_time = time.time()
+        start_ns = perf_counter_ns()
         resp = self.dhan_client.place_order(
             symbol=symbol,
             exchange_segment="NSE_EQ",
@@ -317,7 +454,7 @@ class LadderEngine:
             order_type="MARKET",
             product_type="INTRADAY",
         )
-        perf_monitor.record_order_latency((time.time() - start_time) * 1000)
+        perf_monitor.record_order_latency_ns(perf_counter_ns() - start_ns)
 
         if resp and resp.get("status") == "failure":
             return resp, None
@@ -576,6 +713,21 @@ class LadderEngine:
         self.tsl_mult = self.settings.trailing_stop_loss_pct / 100
         self.target_mult = self.settings.target_percentage / 100
 
+        # Per-tick thresholds, resolved once here instead of on every tick
+        self.no_of_add_ons = int(self.settings.no_of_add_ons)
+        self.min_turnover = float(self.settings.min_turnover_crores) * CRORE
+        try:
+            self.profit_target_per_stock = float(getattr(self.settings, "profit_target_per_stock", 0.0) or 0.0)
+        except Exception:
+            self.profit_target_per_stock = 0.0
+        try:
+            self.loss_limit_per_stock = abs(float(getattr(self.settings, "loss_limit_per_stock", 0.0) or 0.0))
+        except Exception:
+            self.loss_limit_per_stock = 0.0
+        self._process_long_position, self._process_short_position = self._make_position_handlers(
+            self.no_of_add_ons, self.tsl_mult
+        )
+
     def update_settings(self, new_settings: StrategySettings):
         new_settings = self._normalize_settings(new_settings)
         self.settings = new_settings
@@ -607,13 +759,14 @@ class LadderEngine:
             pass
 
         # Mark any pending orders as cancelled so UI doesn't get stuck.
-        for s in self.active_stocks.values():
+        for s in tuple(self.active_stocks.values()):
             if getattr(s, "pending_order", ""):
                 s.last_order_error = f"Cancelled: {reason}"
                 s.pending_order = ""
                 if s.status.startswith("PENDING"):
                     # Revert to best-effort stable state
                     s.status = "ACTIVE" if s.mode != "NONE" else "IDLE"
+        self._notify_state_change(all_stocks=True)
 
     def _normalize_settings(self, settings: StrategySettings) -> StrategySettings:
         """Clamp/adjust settings to avoid invalid combinations from UI."""
@@ -667,10 +820,17 @@ class LadderEngine:
 
     def is_market_hours(self) -> bool:
         """Check if current time is within market hours."""
-        now = datetime.now(IST).time()
-        market_open = dt_time(9, 15)
-        market_close = dt_time(15, 30)  # Market closes at 3:30 PM
-        return market_open <= now <= market_close
+        now = time.time()
+        window = self._market_window
+        if window is None or now >= window[0]:
+            # Epoch bounds are rebuilt once per IST day; otherwise this is two float compares
+            today = datetime.fromtimestamp(now, IST).date()
+            window = self._market_window = (
+                datetime.combine(today + timedelta(days=1), dt_time(0, 0), IST).timestamp(),
+                datetime.combine(today, dt_time(9, 15), IST).timestamp(),
+                datetime.combine(today, dt_time(15, 30), IST).timestamp(),  # Market closes at 3:30 PM
+            )
+        return window[1] <= now <= window[2]
 
     @staticmethod
     def _env_truthy(name: str) -> bool:
@@ -687,7 +847,7 @@ class LadderEngine:
             logger.warning(f"Failed to write mover diagnostics to {path}: {e}")
 
     def _build_mover_diagnostics_payload(self, stocks: List[StockStatus], *, source: str) -> dict:
-        min_turnover = float(self.settings.min_turnover_crores) * 10000000
+        min_turnover = self.min_turnover
         now_ts = datetime.now(IST).isoformat()
 
         def _rec(s: StockStatus) -> dict:
@@ -857,6 +1017,7 @@ class LadderEngine:
             if self._env_truthy("MOVERS_DIAGNOSTICS"):
                 self._diagnose_movers_closed_market()
             self.running = False
+            self._notify_state_change()
             return
 
         self.running = True
@@ -875,6 +1036,7 @@ class LadderEngine:
         if not candidates_map:
             logger.error("No filtered stocks available. Run premarket_filter.py first!")
             self.running = False
+            self._notify_state_change()
             return
             
         candidates = list(candidates_map.keys())
@@ -898,9 +1060,11 @@ class LadderEngine:
                 next_add_on=0.0,
                 stop_loss=0.0,
                 target=0.0,
-                prev_close=candidates_map[symbol],
+                prev_close=float(candidates_map[symbol]),
                 high_watermark=0.0
             )
+        self._rebuild_tick_arrays()
+        self._notify_state_change(all_stocks=True)
 
         # Main loop
         while self.running:
@@ -908,33 +1072,7 @@ class LadderEngine:
             self.calculate_pnl()
 
             # Global P&L exits (if configured)
-            try:
-                profit_exit = float(getattr(self.settings, "global_profit_exit", 0.0) or 0.0)
-            except Exception:
-                profit_exit = 0.0
-            try:
-                loss_exit_raw = float(getattr(self.settings, "global_loss_exit", 0.0) or 0.0)
-            except Exception:
-                loss_exit_raw = 0.0
-            loss_exit = abs(loss_exit_raw)
-
-            if not self.trading_halted:
-                if profit_exit > 0 and self.pnl_global >= profit_exit:
-                    self.trading_halted = True
-                    self.trading_halt_reason = f"Global P&L target reached ({self.pnl_global:.2f} >= {profit_exit:.2f})"
-                    logger.warning(self.trading_halt_reason)
-                    await self.square_off_all(
-                        reason="Global P&L target reached",
-                        final_status="CLOSED_GLOBAL_PROFIT",
-                    )
-                elif loss_exit > 0 and self.pnl_global <= -loss_exit:
-                    self.trading_halted = True
-                    self.trading_halt_reason = f"Global P&L loss limit reached ({self.pnl_global:.2f} <= {-loss_exit:.2f})"
-                    logger.warning(self.trading_halt_reason)
-                    await self.square_off_all(
-                        reason="Global P&L loss limit reached",
-                        final_status="CLOSED_GLOBAL_LOSS",
-                    )
+            await self.check_global_exits()
             
             # Auto square-off at 3:20 PM
             if not self.is_market_hours() and self.running:
@@ -943,38 +1081,42 @@ class LadderEngine:
                 # Stop feed to avoid reconnect storms after market close
                 self.dhan_client.stop_feed()
                 self.running = False
+                self._notify_state_change()
 
     def process_tick(self, symbol: str, ltp: float, volume: float = 0.0):
         """Process incoming tick data with performance tracking."""
-        start_time = time.time()
+        start_ns = perf_counter_ns()
         
         if not self.running or symbol not in self.active_stocks:
             return
+        self._ensure_tick_arrays()
 
         lock = self._get_stock_lock(symbol)
         # Never block tick thread: skip tick if this stock is being updated by an order worker.
         if not lock.acquire(blocking=False):
             return
+        before = None
         try:
             stock = self.active_stocks[symbol]
 
             if stock.status == "STOPPED" or stock.status.startswith("CLOSED"):
                 return
+            before = _tick_visible_fields(stock)
 
-            # Update LTP and turnover
-            stock.ltp = ltp
+            # Update LTP, turnover and % change (stock + SoA mirror)
+            prev_close = stock.prev_close
             stock.last_volume = float(volume or 0.0)
-            if volume > 0:
-                stock.turnover = volume * ltp
+            self._set_market_fields(
+                stock,
+                ltp,
+                volume * ltp if volume > 0 else stock.turnover,
+                ((ltp - prev_close) / prev_close) * 100 if prev_close > 0 else stock.change_pct,
+            )
 
             # Capture "day open" approximation from first observed tick.
-            if getattr(stock, "day_open", 0.0) <= 0 and ltp > 0 and stock.prev_close > 0:
+            if getattr(stock, "day_open", 0.0) <= 0 and ltp > 0 and prev_close > 0:
                 stock.day_open = float(ltp)
-                stock.open_gap_pct = ((stock.day_open - stock.prev_close) / stock.prev_close) * 100.0
-
-            # Calculate % Change
-            if stock.prev_close > 0:
-                stock.change_pct = ((ltp - stock.prev_close) / stock.prev_close) * 100
+                stock.open_gap_pct = ((stock.day_open - prev_close) / prev_close) * 100.0
 
             # Update high watermark for trailing SL
             if stock.mode != "NONE":
@@ -994,14 +1136,12 @@ class LadderEngine:
 
             # If trading is halted, don't take any new actions (but keep updating UI fields).
             if self.trading_halted:
-                latency_ms = (time.time() - start_time) * 1000
-                perf_monitor.record_tick_latency(latency_ms)
+                perf_monitor.record_tick_latency_ns(perf_counter_ns() - start_ns)
                 return
 
             # If an order is in-flight for this stock, don't trigger new actions.
             if getattr(stock, "pending_order", ""):
-                latency_ms = (time.time() - start_time) * 1000
-                perf_monitor.record_tick_latency(latency_ms)
+                perf_monitor.record_tick_latency_ns(perf_counter_ns() - start_ns)
                 return
 
             # Trading Logic
@@ -1011,16 +1151,8 @@ class LadderEngine:
                 self._process_short_position(stock)
 
             # Per-stock P&L limits
-            try:
-                profit_target = float(getattr(self.settings, "profit_target_per_stock", 0.0) or 0.0)
-            except Exception:
-                profit_target = 0.0
-            try:
-                loss_limit_raw = float(getattr(self.settings, "loss_limit_per_stock", 0.0) or 0.0)
-            except Exception:
-                loss_limit_raw = 0.0
-            loss_limit = abs(loss_limit_raw)
-
+            profit_target = self.profit_target_per_stock
+            loss_limit = self.loss_limit_per_stock
             if profit_target > 0 and stock.pnl >= profit_target:
                 self.close_position(stock, "Stock profit target reached", final_status="CLOSED_STOCK_PROFIT_LIMIT")
             elif loss_limit > 0 and stock.pnl <= -loss_limit:
@@ -1030,59 +1162,74 @@ class LadderEngine:
             self._maybe_select_top_movers()
 
             # Record performance
-            latency_ms = (time.time() - start_time) * 1000
-            perf_monitor.record_tick_latency(latency_ms)
+            perf_monitor.record_tick_latency_ns(perf_counter_ns() - start_ns)
         finally:
             try:
                 lock.release()
             except Exception:
                 pass
+            if before is not None and _tick_visible_fields(stock) != before:
+                self._notify_state_change(symbol)
 
-    def _process_long_position(self, stock: StockStatus):
-        """Process LONG position logic."""
-        # 1. Check Target
-        if stock.ltp >= stock.target:
-            self._finish_ladder_cycle(stock, reason="Target Hit")
-            return
+    def _make_position_handlers(self, no_of_add_ons: int, tsl_mult: float):
+        """
+        Build the per-tick LONG/SHORT handlers with the current settings baked in as
+        closure constants (rebuilt by _update_multipliers whenever settings change).
+        """
+        long_tsl = 1 - tsl_mult
+        short_tsl = 1 + tsl_mult
+
+        def _process_long_position(stock: StockStatus):
+            """Process LONG position logic."""
+            ltp = stock.ltp
+            # 1. Check Target
+            if ltp >= stock.target:
+                self._finish_ladder_cycle(stock, reason="Target Hit")
+                return
 
-        # 2. Check Stop Loss / TSL
-        if stock.ltp <= stock.stop_loss:
-            self._finish_ladder_cycle(stock, reason="SL Hit")
-            return
+            # 2. Check Stop Loss / TSL
+            if ltp <= stock.stop_loss:
+                self._finish_ladder_cycle(stock, reason="SL Hit")
+                return
 
-        # 3. Add-on Logic (Pyramiding)
-        if stock.ladder_level < self.settings.no_of_add_ons:
-            if stock.ltp >= stock.next_add_on:
-                self.execute_add_on(stock, "LONG")
-        
-        # 4. Update Trailing SL using high watermark
-        if stock.high_watermark > 0:
-            dynamic_sl = stock.high_watermark * (1 - self.tsl_mult)
-            if dynamic_sl > stock.stop_loss:
-                stock.stop_loss = dynamic_sl
-
-    def _process_short_position(self, stock: StockStatus):
-        """Process SHORT position logic."""
-        # 1. Check Target
-        if stock.ltp <= stock.target:
-            self._finish_ladder_cycle(stock, reason="Target Hit")
-            return
+            # 3. Add-on Logic (Pyramiding)
+            if stock.ladder_level < no_of_add_ons:
+                if ltp >= stock.next_add_on:
+                    self.execute_add_on(stock, "LONG")
+
+            # 4. Update Trailing SL using high watermark
+            hwm = stock.high_watermark
+            if hwm > 0:
+                dynamic_sl = hwm * long_tsl
+                if dynamic_sl > stock.stop_loss:
+                    stock.stop_loss = dynamic_sl
+
+        def _process_short_position(stock: StockStatus):
+            """Process SHORT position logic."""
+            ltp = stock.ltp
+            # 1. Check Target
+            if ltp <= stock.target:
+                self._finish_ladder_cycle(stock, reason="Target Hit")
+                return
 
-        # 2. Check SL
-        if stock.ltp >= stock.stop_loss:
-            self._finish_ladder_cycle(stock, reason="SL Hit")
-            return
+            # 2. Check SL
+            if ltp >= stock.stop_loss:
+                self._finish_ladder_cycle(stock, reason="SL Hit")
+                return
 
-        # 3. Add-on Logic
-        if stock.ladder_level < self.settings.no_of_add_ons:
-            if stock.ltp <= stock.next_add_on:
-                self.execute_add_on(stock, "SHORT")
-        
-        # 4. TSL
-        if stock.high_watermark > 0:
-            dynamic_sl = stock.high_watermark * (1 + self.tsl_mult)
-            if dynamic_sl < stock.stop_loss or stock.stop_loss == 0:
-                stock.stop_loss = dynamic_sl
+            # 3. Add-on Logic
+            if stock.ladder_level < no_of_add_ons:
+                if ltp <= stock.next_add_on:
+                    self.execute_add_on(stock, "SHORT")
+
+            # 4. TSL
+            hwm = stock.high_watermark
+            if hwm > 0:
+                dynamic_sl = hwm * short_tsl
+                if dynamic_sl < stock.stop_loss or stock.stop_loss == 0:
+                    stock.stop_loss = dynamic_sl
+
+        return _process_long_position, _process_short_position
 
     def _close_and_flip(self, stock: StockStatus, flip_to: str, reason: str, *, cycle_index_next: int | None = None):
         """Close current position and open opposite direction without blocking tick thread."""
@@ -1229,21 +1376,37 @@ class LadderEngine:
                 stock.status = "ACTIVE"
                 self._clear_pending(stock)
 
+    def _reserve_start_slot(self, symbol: str) -> bool | None:
+        """
+        Check the max_ladder_stocks cap and reserve a pending-start slot in one step, so
+        two concurrent selections cannot both pass the check. Returns True if this call
+        reserved the slot, False if the symbol already holds one, None if the cap is reached.
+        """
+        with self._started_lock:
+            if symbol in self.started_symbols or symbol in self._pending_start_symbols:
+                return False
+            if len(self.started_symbols) + len(self._pending_start_symbols) >= self.settings.max_ladder_stocks:
+                return None
+            self._pending_start_symbols.add(symbol)
+            return True
+
     def start_long_ladder(self, stock: StockStatus):
         """Queue LONG ladder start (non-blocking)."""
         symbol = stock.symbol
-        with self._started_lock:
-            started_or_pending = len(self.started_symbols) + len(self._pending_start_symbols)
-        if symbol not in self.started_symbols and symbol not in self._pending_start_symbols and started_or_pending >= self.settings.max_ladder_stocks:
+        reserved = self._reserve_start_slot(symbol)
+        if reserved is None:
             logger.info(
                 f"SKIP LONG {symbol}: max ladder stocks reached "
-                f"({started_or_pending}/{self.settings.max_ladder_stocks})"
+                f"({len(self.started_symbols) + len(self._pending_start_symbols)}/{self.settings.max_ladder_stocks})"
             )
             return
 
         lock = self._get_stock_lock(symbol)
         with lock:
             if stock.pending_order or stock.status != "IDLE":
+                if reserved:
+                    with self._started_lock:
+                        self._pending_start_symbols.discard(symbol)
                 return
             if int(getattr(stock, "cycle_total", 1) or 1) <= 1:
                 try:
@@ -1280,18 +1443,20 @@ class LadderEngine:
     def start_short_ladder(self, stock: StockStatus):
         """Queue SHORT ladder start (non-blocking)."""
         symbol = stock.symbol
-        with self._started_lock:
-            started_or_pending = len(self.started_symbols) + len(self._pending_start_symbols)
-        if symbol not in self.started_symbols and symbol not in self._pending_start_symbols and started_or_pending >= self.settings.max_ladder_stocks:
+        reserved = self._reserve_start_slot(symbol)
+        if reserved is None:
             logger.info(
                 f"SKIP SHORT {symbol}: max ladder stocks reached "
-                f"({started_or_pending}/{self.settings.max_ladder_stocks})"
+                f"({len(self.started_symbols) + len(self._pending_start_symbols)}/{self.settings.max_ladder_stocks})"
             )
             return
 
         lock = self._get_stock_lock(symbol)
         with lock:
             if stock.pending_order or stock.status != "IDLE":
+                if reserved:
+                    with self._started_lock:
+                        self._pending_start_symbols.discard(symbol)
                 return
             if int(getattr(stock, "cycle_total", 1) or 1) <= 1:
                 try:
@@ -1326,14 +1491,46 @@ class LadderEngine:
                 self._pending_start_symbols.discard(symbol)
 
     def calculate_pnl(self):
-        """Calculate total P&L using NumPy for performance."""
-        pnl_values = [s.pnl for s in self.active_stocks.values()]
-        self.pnl_global = np.sum(pnl_values) if pnl_values else 0.0
+        """Calculate total P&L (no intermediate list/array; fsum keeps it exact)."""
+        pnl_global = math.fsum(s.pnl for s in self._stocks_tuple())
+        if pnl_global != self.pnl_global:
+            self.pnl_global = pnl_global
+            self._notify_state_change()
+
+    async def check_global_exits(self) -> bool:
+        """
+        Halt trading and square off everything if pnl_global crossed the configured
+        global profit/loss exit. Returns True if this call triggered the halt.
+        """
+        if self.trading_halted:
+            return False
+        try:
+            profit_exit = float(getattr(self.settings, "global_profit_exit", 0.0) or 0.0)
+        except Exception:
+            profit_exit = 0.0
+        try:
+            loss_exit_raw = float(getattr(self.settings, "global_loss_exit", 0.0) or 0.0)
+        except Exception:
+            loss_exit_raw = 0.0
+        loss_exit = abs(loss_exit_raw)
+
+        if profit_exit > 0 and self.pnl_global >= profit_exit:
+            self.trading_halt_reason = f"Global P&L target reached ({self.pnl_global:.2f} >= {profit_exit:.2f})"
+            reason, final_status = "Global P&L target reached", "CLOSED_GLOBAL_PROFIT"
+        elif loss_exit > 0 and self.pnl_global <= -loss_exit:
+            self.trading_halt_reason = f"Global P&L loss limit reached ({self.pnl_global:.2f} <= {-loss_exit:.2f})"
+            reason, final_status = "Global P&L loss limit reached", "CLOSED_GLOBAL_LOSS"
+        else:
+            return False
+
+        self.trading_halted = True
+        logger.warning(self.trading_halt_reason)
+        await self.square_off_all(reason=reason, final_status=final_status)
+        return True
 
     def _maybe_select_top_movers(self):
         """Run mover selection at most once per interval (reactive)."""
-        import time
-        now = time.time()
+        now = time.monotonic()
         if (now - self._last_select_ts) < self._select_interval_seconds:
             return
         self._last_select_ts = now
@@ -1341,18 +1538,18 @@ class LadderEngine:
 
     def select_top_movers(self):
         """Rank stocks and activate ladders for top movers."""
-        min_turnover = self.settings.min_turnover_crores * 10000000
+        min_turnover = self.min_turnover
 
         logger.info(
-            f"Selecting movers: min_turnover={self.settings.min_turnover_crores:.2f} Cr "
-            f"({min_turnover:.0f})"
+            "Selecting movers: min_turnover=%.2f Cr (%.0f)",
+            self.settings.min_turnover_crores, min_turnover,
         )
         
         active_longs = 0
         active_shorts = 0
         pending_longs = 0
         pending_shorts = 0
-        for s in self.active_stocks.values():
+        for s in self._stocks_tuple():
             if s.pending_order == "START_LONG":
                 pending_longs += 1
             elif s.pending_order == "START_SHORT":
@@ -1373,14 +1570,14 @@ class LadderEngine:
 
         if started_or_pending >= max_ladders:
             logger.info(
-                f"Max ladder stocks reached for session ({started_or_pending}/{max_ladders}) "
-                f"- not starting new symbols"
+                "Max ladder stocks reached for session (%d/%d) - not starting new symbols",
+                started_or_pending, max_ladders,
             )
             return
 
         if active_total >= max_ladders:
             logger.info(
-                f"Max ladder stocks reached ({active_total}/{max_ladders}) - not starting new ladders"
+                "Max ladder stocks reached (%d/%d) - not starting new ladders", active_total, max_ladders
             )
             return
 
@@ -1396,32 +1593,39 @@ class LadderEngine:
 
         if need_longs <= 0 and need_shorts <= 0:
             logger.info(
-                f"No new ladders needed (active_longs={active_longs}/{self.settings.top_n_gainers}, "
-                f"active_shorts={active_shorts}/{self.settings.top_n_losers}, "
-                f"max={max_ladders})"
+                "No new ladders needed (active_longs=%d/%s, active_shorts=%d/%s, max=%d)",
+                active_longs, self.settings.top_n_gainers,
+                active_shorts, self.settings.top_n_losers,
+                max_ladders,
             )
             return
 
-        idle_stocks = []
-        for s in self.active_stocks.values():
-            if s.status != "IDLE":
-                continue
-            if s.ltp <= 0:
-                logger.debug(f"FILTERED {s.symbol}: LTP<=0 (ltp={s.ltp})")
-                continue
-            if s.turnover < min_turnover:
-                logger.debug(
-                    f"FILTERED {s.symbol}: Turnover below threshold "
-                    f"(turnover={s.turnover:.0f}, min={min_turnover:.0f})"
-                )
-                continue
-            idle_stocks.append(s)
+        # LTP/turnover filter runs on the SoA arrays; only survivors are touched as objects
+        self._ensure_tick_arrays(check_entries=True)
+        stocks = self._soa_stocks
+        eligible = (self.ltp_arr > 0) & (self.turnover_arr >= min_turnover)
+        idle_idx = np.fromiter(
+            (i for i in np.flatnonzero(eligible) if stocks[i].status == "IDLE"), dtype=np.intp
+        )
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for i in np.flatnonzero(~eligible):
+                s = stocks[i]
+                if s.status != "IDLE":
+                    continue
+                if s.ltp <= 0:
+                    logger.debug("FILTERED %s: LTP<=0 (ltp=%s)", s.symbol, s.ltp)
+                else:
+                    logger.debug(
+                        "FILTERED %s: Turnover below threshold (turnover=%.0f, min=%.0f)",
+                        s.symbol, s.turnover, min_turnover,
+                    )
 
         # Optional diagnostics: dump why symbols are being filtered out (without changing workflows).
         # Enable with MOVERS_DIAGNOSTICS=1 (and MOVERS_DIAGNOSTICS_LOG_ALL=1 for per-symbol logs).
         self._maybe_emit_movers_diagnostics(source="ws_select_top_movers")
         
-        if not idle_stocks:
+        if idle_idx.size == 0:
             logger.info("No eligible idle stocks after turnover/LTP filters")
             return
             
@@ -1446,27 +1650,28 @@ class LadderEngine:
                     return ((open_px - float(s.prev_close)) / float(s.prev_close)) * 100.0
             return 0.0
 
-        long_candidates = [s for s in idle_stocks if s.change_pct > 0 and _gap_pct(s) <= max_gap_long]
-        short_candidates = [s for s in idle_stocks if s.change_pct < 0 and _gap_pct(s) >= min_gap_short]
-
-        # Sort by % Change
-        long_candidates.sort(key=lambda x: x.change_pct, reverse=True)
-        short_candidates.sort(key=lambda x: x.change_pct)  # Most negative first
-
-        top_gainers = long_candidates[:need_longs] if need_longs > 0 else []
-        top_losers = short_candidates[:need_shorts] if need_shorts > 0 else []
+        # Rank by % change (top-K selection on the arrays; most negative first for losers)
+        change = self.change_pct_arr[idle_idx]
+        up = change > 0
+        down = change < 0
+        top_gainers = self._top_k(
+            idle_idx[up], change[up], need_longs, lambda s: _gap_pct(s) <= max_gap_long
+        )
+        top_losers = self._top_k(
+            idle_idx[down], -change[down], need_shorts, lambda s: _gap_pct(s) >= min_gap_short
+        )
 
-        if top_gainers:
+        if top_gainers and logger.isEnabledFor(logging.INFO):
             logger.info(
                 "Top Gainers (selected): " + ", ".join(
-                    f"{s.symbol}({s.change_pct:.2f}%, turnover={s.turnover/10000000:.2f}Cr)"
+                    f"{s.symbol}({s.change_pct:.2f}%, turnover={s.turnover / CRORE:.2f}Cr)"
                     for s in top_gainers
                 )
             )
-        if top_losers:
+        if top_losers and logger.isEnabledFor(logging.INFO):
             logger.info(
                 "Top Losers (selected): " + ", ".join(
-                    f"{s.symbol}({s.change_pct:.2f}%, turnover={s.turnover/10000000:.2f}Cr)"
+                    f"{s.symbol}({s.change_pct:.2f}%, turnover={s.turnover / CRORE:.2f}Cr)"
                     for s in top_losers
                 )
             )
@@ -1478,19 +1683,42 @@ class LadderEngine:
         cycles_total = max(1, cycles_total)
 
         for stock in top_gainers:
-            logger.info(f"Activating LONG: {stock.symbol} ({stock.change_pct:.2f}%)")
+            logger.info("Activating LONG: %s (%.2f%%)", stock.symbol, stock.change_pct)
             stock.cycle_total = cycles_total
             stock.cycle_index = 0
             stock.cycle_start_mode = "LONG"
             self.start_long_ladder(stock)
 
         for stock in top_losers:
-            logger.info(f"Activating SHORT: {stock.symbol} ({stock.change_pct:.2f}%)")
+            logger.info("Activating SHORT: %s (%.2f%%)", stock.symbol, stock.change_pct)
             stock.cycle_total = cycles_total
             stock.cycle_index = 0
             stock.cycle_start_mode = "SHORT"
             self.start_short_ladder(stock)
 
+    def _top_k(self, idx: np.ndarray, scores: np.ndarray, k: int, keep) -> List[StockStatus]:
+        """
+        Stocks at positions idx with the k highest scores (descending, ties in tracking
+        order) that pass keep(stock). Uses argpartition; falls back to a full ranking
+        only when some of the top k are rejected by keep.
+        """
+        if k <= 0 or idx.size == 0:
+            return []
+        stocks = self._soa_stocks
+        n = idx.size
+        if k < n:
+            # k-th best score in O(n); keep every tie with it so ordering matches a full sort
+            kth = -np.partition(-scores, k - 1)[k - 1]
+            part = np.flatnonzero(scores >= kth)
+        else:
+            part = np.arange(n)
+        part = part[np.argsort(-scores[part], kind="stable")]
+        picked = [stocks[i] for i in idx[part] if keep(stocks[i])][:k]
+        if len(picked) < k and k < n:
+            order = np.argsort(-scores, kind="stable")
+            picked = [s for s in (stocks[i] for i in idx[order]) if keep(s)][:k]
+        return picked
+
     def load_filtered_stocks(self, filepath: str = 'filtered_stocks.json') -> Dict[str, float]:
         """
         Load pre-filtered stocks from JSON file generated by premarket_filter.py.
@@ -1501,10 +1729,30 @@ class LadderEngine:
         Returns:
             Dictionary mapping symbols to their previous close prices
         """
+        # Same-process cache for the trading day; a premarket rerun rewrites the
+        # JSON file, so its mtime is part of the key.
+        try:
+            mtime = os.path.getmtime(filepath)
+        except OSError:
+            mtime = None
+        cache_key = (datetime.now(IST).date(), filepath, mtime)
+        if self.filtered_stocks_cache and self.cache_timestamp == cache_key:
+            return self.filtered_stocks_cache
+
+        # The key changed (new day or rewritten file): premarket ran in another process, so
+        # the redis_store TTL entry may predate it; read Redis fresh before caching by this key.
+        invalidate_candidates_cache()
+        candidates = self._load_filtered_stocks_uncached(filepath)
+        if candidates:
+            self.filtered_stocks_cache = candidates
+            self.cache_timestamp = cache_key
+        return candidates
+
+    def _load_filtered_stocks_uncached(self, filepath: str) -> Dict[str, float]:
         # Try Redis first (same-day cache)
         cached = load_candidates()
         if cached and cached.get("candidates"):
-            current_count, current_hash = _stock_list_signature(STOCK_LIST)
+            current_count, current_hash = STOCK_LIST_SIGNATURE
             cached_count = cached.get("stock_list_count")
             cached_hash = cached.get("stock_list_hash")
 
@@ -1526,7 +1774,7 @@ class LadderEngine:
                         "Run 'python premarket_filter.py --force' to refresh."
                     )
                 else:
-                    stock_set = {str(s).strip().upper() for s in STOCK_LIST}
+                    stock_set = STOCK_SET
                     raw_candidates = cached.get("candidates", {}) or {}
                     candidates = {
                         str(sym).strip().upper(): float(prev_close)
@@ -1549,8 +1797,8 @@ class LadderEngine:
             return {}
         
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
+            with open(filepath, 'rb') as f:
+                data = _loads(f.read())
             
             candidates = data.get('candidates', {})
             timestamp = data.get('timestamp', 'unknown')
@@ -1569,7 +1817,7 @@ class LadderEngine:
         """Emergency square-off all positions."""
         logger.warning(f"SQUARE OFF ALL triggered ({reason})")
         
-        for stock in self.active_stocks.values():
+        for stock in self._stocks_tuple():
             if stock.mode != "NONE" and stock.quantity > 0:
                 self.close_position(stock, reason, final_status=final_status)
         
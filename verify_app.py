@@ -6,6 +6,7 @@ Tests core functionality and performance of the Dhan trading application.
 import asyncio
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Setup logging
@@ -175,11 +176,9 @@ def test_dhan_client_structure():
         
         client = DhanClientWrapper()
         assert client.is_connected == False
-        assert hasattr(client, 'symbol_map')
-        assert hasattr(client, 'id_map')
-        assert hasattr(client, 'get_security_id')
-        assert hasattr(client, 'subscribe')
-        assert hasattr(client, 'place_order')
+        expected = {'symbol_map', 'id_map', 'get_security_id', 'subscribe', 'place_order'}
+        missing = expected - set(dir(client))
+        assert not missing, f"missing attributes: {sorted(missing)}"
         
         logger.info("PASS: Dhan client structure valid")
         return True
@@ -197,13 +196,12 @@ def test_strategy_engine_structure():
         client = DhanClientWrapper()
         engine = LadderEngine(client)
         
-        assert hasattr(engine, 'active_stocks')
-        assert hasattr(engine, 'order_manager')
-        assert hasattr(engine, 'settings')
-        assert hasattr(engine, 'process_tick')
-        assert hasattr(engine, 'start_long_ladder')
-        assert hasattr(engine, 'start_short_ladder')
-        assert hasattr(engine, 'calculate_pnl')
+        expected = {
+            'active_stocks', 'order_manager', 'settings', 'process_tick',
+            'start_long_ladder', 'start_short_ladder', 'calculate_pnl',
+        }
+        missing = expected - set(dir(engine))
+        assert not missing, f"missing attributes: {sorted(missing)}"
         
         logger.info("PASS: Strategy engine structure valid")
         return True
@@ -257,15 +255,20 @@ def run_all_tests():
         ("API Structure", test_api_structure),
     ]
     
-    results = []
-    for test_name, test_func in tests:
+    def _run(test):
+        test_name, test_func = test
         logger.info(f"\n--- Running: {test_name} ---")
         try:
-            result = test_func()
-            results.append((test_name, result))
+            return test_name, test_func()
         except Exception as e:
             logger.error(f"Test {test_name} crashed: {e}")
-            results.append((test_name, False))
+            return test_name, False
+
+    # Imports runs first so the heavy modules are loaded once; the remaining tests
+    # only build their own objects and can run side by side.
+    results = [_run(tests[0])]
+    with ThreadPoolExecutor(max_workers=len(tests) - 1) as ex:
+        results.extend(ex.map(_run, tests[1:]))
     
     # Summary
     logger.info("\n" + "="*60)
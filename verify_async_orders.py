@@ -42,19 +42,19 @@ def test_start_order_is_async_and_tick_not_blocked():
     engine.active_stocks = {"TST": stock}
 
     # Enqueue start; should return immediately (no REST blocking)
-    t0 = time.time()
+    t0 = time.monotonic()
     engine.start_long_ladder(stock)
-    assert (time.time() - t0) < 0.05, "start_long_ladder should not block"
+    assert (time.monotonic() - t0) < 0.05, "start_long_ladder should not block"
     assert stock.pending_order == "START_LONG"
 
     # Tick should also return quickly (it will see pending_order and skip trading actions)
-    t1 = time.time()
+    t1 = time.monotonic()
     engine.process_tick("TST", 100.5, 1000.0)
-    assert (time.time() - t1) < 0.05, "process_tick should not block on REST orders"
+    assert (time.monotonic() - t1) < 0.05, "process_tick should not block on REST orders"
 
     # Wait for worker to complete
-    deadline = time.time() + 3.0
-    while time.time() < deadline:
+    deadline = time.monotonic() + 3.0
+    while time.monotonic() < deadline:
         if engine.active_stocks["TST"].mode == "LONG" and engine.active_stocks["TST"].pending_order == "":
             break
         time.sleep(0.05)
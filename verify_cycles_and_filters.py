@@ -1,5 +1,4 @@
 import asyncio
-import time
 from unittest.mock import AsyncMock, MagicMock
 
 from config import StockStatus, StrategySettings
@@ -179,13 +178,9 @@ def test_three_cycle_alternation_calls_flip_then_close():
 async def test_global_profit_exit_triggers_square_off_and_halts():
     mock_dhan = MagicMock(spec=DhanClientWrapper)
     mock_dhan.is_connected = True
-    mock_dhan.subscribe = MagicMock()
-    mock_dhan.stop_feed = MagicMock()
 
     engine = LadderEngine(mock_dhan)
-    engine.is_market_hours = MagicMock(return_value=True)
-    engine.load_filtered_stocks = MagicMock(return_value={"TST": 100.0})
-
+    engine.running = True
     engine.update_settings(
         StrategySettings(
             global_profit_exit=8000.0,
@@ -194,28 +189,35 @@ async def test_global_profit_exit_triggers_square_off_and_halts():
         )
     )
 
-    # Create a position with pnl over threshold after engine initializes tracking.
+    engine.active_stocks = {
+        "TST": StockStatus(
+            symbol="TST",
+            mode="LONG",
+            ltp=190.0,
+            change_pct=0.0,
+            pnl=9000.0,
+            status="ACTIVE",
+            entry_price=100.0,
+            quantity=100,
+            ladder_level=1,
+            next_add_on=0.0,
+            stop_loss=0.0,
+            target=0.0,
+            prev_close=100.0,
+        )
+    }
     async_square_off = AsyncMock()
     engine.square_off_all = async_square_off
 
-    task = asyncio.create_task(engine.start_strategy())
-    try:
-        deadline = time.time() + 5.0
-        while time.time() < deadline:
-            if "TST" in engine.active_stocks:
-                engine.active_stocks["TST"].pnl = 9000.0
-            await asyncio.sleep(0.2)
-            if engine.trading_halted:
-                break
-
-        assert engine.trading_halted is True
-        async_square_off.assert_awaited()
-    finally:
-        engine.running = False
-        try:
-            await asyncio.wait_for(task, timeout=3.0)
-        except Exception:
-            pass
+    engine.calculate_pnl()
+    assert await engine.check_global_exits() is True
+
+    assert engine.trading_halted is True
+    async_square_off.assert_awaited_once()
+
+    # Already halted: a second check is a no-op
+    assert await engine.check_global_exits() is False
+    async_square_off.assert_awaited_once()
 
 
 def main():
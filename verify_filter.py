@@ -1,5 +1,10 @@
 import logging
 import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 import pandas as pd
 from unittest.mock import MagicMock, patch
 from strategy_engine import LadderEngine, STOCK_LIST
@@ -35,8 +40,12 @@ def test_load_filtered_stocks():
     }
     
     # Write test JSON
-    with open('test_filtered_stocks.json', 'w') as f:
-        json.dump(test_data, f, indent=2)
+    if orjson is not None:
+        with open('test_filtered_stocks.json', 'wb') as f:
+            f.write(orjson.dumps(test_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open('test_filtered_stocks.json', 'w') as f:
+            json.dump(test_data, f, indent=2)
     
     # Initialize Engine
     engine = LadderEngine(mock_dhan)
@@ -0,0 +1,74 @@
+import tempfile
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from dhan_client import DhanClientWrapper, HistoryFetchError, IST
+
+
+class FakeHistoryDhan:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def historical_daily_data(self, **kwargs):
+        self.calls += 1
+        return self.response
+
+
+def _client_with_cache(response, cache_dir: Path) -> DhanClientWrapper:
+    client = DhanClientWrapper(max_requests_per_second=100.0)
+    client.is_connected = True
+    client.dhan = FakeHistoryDhan(response)
+    client.symbol_map = {"TST-EQ": 1}
+    client.id_map = {1: "TST-EQ"}
+    client._sid_by_symbol = {"TST": 1}
+    client._bars_cache_dir = cache_dir
+
+    # Cached closed sessions ending 8 days ago: the fetch for the newer days must hit the API
+    today = datetime.now(IST).date()
+    days = [today - timedelta(days=d) for d in range(20, 7, -1)]
+    bars = pd.DataFrame(
+        {
+            "timestamp": [int(datetime.combine(d, dt_time(9, 15), IST).timestamp()) for d in days],
+            "close": [100.0] * len(days),
+            "volume": [1_000_000] * len(days),
+        }
+    )
+    client._write_bars_cache("TST", "NSE_EQ", bars, today - timedelta(days=30), today)
+    assert client._read_bars_cache("TST", "NSE_EQ", today - timedelta(days=15)) is not None
+    return client
+
+
+def test_auth_failure_with_cache_raises_instead_of_serving_stale_bars():
+    auth_failure = {
+        "status": "failure",
+        "remarks": {"error_code": "DH-901", "error_type": "Invalid_Authentication", "error_message": "Invalid token"},
+        "data": "",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client_with_cache(auth_failure, Path(tmp))
+        try:
+            client.get_historical_data("TST", days=15, raise_on_error=True)
+        except HistoryFetchError:
+            pass
+        else:
+            raise AssertionError("auth failure with a cache present must raise HistoryFetchError")
+        assert client.dhan.calls == 1
+
+        assert client.get_historical_data("TST", days=15) is None
+
+
+def test_no_data_response_serves_cache():
+    no_data = {"status": "failure", "remarks": {"error_code": "DH-905"}, "data": ""}
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client_with_cache(no_data, Path(tmp))
+        df = client.get_historical_data("TST", days=15, raise_on_error=True)
+        assert df is not None and not df.empty
+
+
+if __name__ == "__main__":
+    test_auth_failure_with_cache_raises_instead_of_serving_stale_bars()
+    test_no_data_response_serves_cache()
+    print("OK")
@@ -1,5 +1,6 @@
 import logging
 import time
+from dataclasses import replace
 from unittest.mock import MagicMock
 
 from config import StockStatus, StrategySettings
@@ -8,6 +9,24 @@ from strategy_engine import LadderEngine
 
 logging.basicConfig(level=logging.INFO)
 
+# Eligible idle mover (2 Cr turnover); tests copy it with dataclasses.replace
+_IDLE_MOVER = StockStatus(
+    symbol="",
+    mode="NONE",
+    ltp=100.0,
+    change_pct=0.0,
+    pnl=0.0,
+    status="IDLE",
+    entry_price=0.0,
+    quantity=0,
+    ladder_level=0,
+    next_add_on=0.0,
+    stop_loss=0.0,
+    target=0.0,
+    open_gap_pct=0.0,
+    turnover=2_00_00_000.0,  # 2 Cr
+)
+
 
 def test_max_ladder_stocks_limits_new_starts():
     mock_dhan = MagicMock(spec=DhanClientWrapper)
@@ -36,43 +55,23 @@ def test_max_ladder_stocks_limits_new_starts():
     active = {}
     for i in range(60):
         sym = f"G{i:02d}"
-        active[sym] = StockStatus(
+        active[sym] = replace(
+            _IDLE_MOVER,
             symbol=sym,
-            mode="NONE",
-            ltp=100.0,
             change_pct=5.0 - (i * 0.01),
-            pnl=0.0,
-            status="IDLE",
-            entry_price=0.0,
-            quantity=0,
-            ladder_level=0,
-            next_add_on=0.0,
-            stop_loss=0.0,
-            target=0.0,
             prev_close=95.0,
             day_open=95.0,
-            open_gap_pct=0.0,
-            turnover=2_00_00_000.0,  # 2 Cr
+            order_ids=[],
         )
     for i in range(60):
         sym = f"L{i:02d}"
-        active[sym] = StockStatus(
+        active[sym] = replace(
+            _IDLE_MOVER,
             symbol=sym,
-            mode="NONE",
-            ltp=100.0,
             change_pct=-(5.0 - (i * 0.01)),
-            pnl=0.0,
-            status="IDLE",
-            entry_price=0.0,
-            quantity=0,
-            ladder_level=0,
-            next_add_on=0.0,
-            stop_loss=0.0,
-            target=0.0,
             prev_close=105.0,
             day_open=105.0,
-            open_gap_pct=0.0,
-            turnover=2_00_00_000.0,  # 2 Cr
+            order_ids=[],
         )
 
     engine.active_stocks = active
@@ -82,8 +81,8 @@ def test_max_ladder_stocks_limits_new_starts():
         engine.select_top_movers()
 
     # Wait for async workers to execute queued orders
-    deadline = time.time() + 5.0
-    while time.time() < deadline:
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
         active_positions = [s for s in engine.active_stocks.values() if s.mode != "NONE"]
         if len(active_positions) == 20:
             break
@@ -0,0 +1,99 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+import premarket_filter
+from dhan_client import HistoryFetchError
+from premarket_filter import BREAKER_COOLOFF_SECONDS, BREAKER_THRESHOLD, PremarketFilter, REQUIRED_DAYS
+
+
+_ROWS = max(REQUIRED_DAYS, 6)
+_BARS = pd.DataFrame(
+    {
+        "volume": np.full(_ROWS, 1_000_000, dtype=np.int64),
+        "close": np.full(_ROWS, 100.0),
+    }
+)
+
+
+class FailingDhan:
+    """Raises HistoryFetchError (an API-level failure) until healthy is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.healthy = False
+
+    async def get_historical_data_async(self, symbol: str, exchange_segment="NSE_EQ", days=15, raise_on_error=False):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if not self.healthy:
+            raise HistoryFetchError("DH-901 Invalid token")
+        return _BARS
+
+
+def _expire_cooloff(engine: PremarketFilter):
+    engine._breaker_opened_at -= BREAKER_COOLOFF_SECONDS + 1.0
+
+
+async def test_breaker_trips_skips_and_probes_once():
+    dhan = FailingDhan()
+    engine = PremarketFilter(dhan)
+    symbols = [f"S{i:03d}" for i in range(BREAKER_THRESHOLD * 3)]
+
+    # Trips at the threshold; every later symbol is skipped during the cool-off
+    out = await engine.filter_all_stocks(symbols=symbols, max_in_flight=1)
+    assert out == {}
+    assert dhan.calls == BREAKER_THRESHOLD, dhan.calls
+    assert engine.breaker_tripped
+
+    # Half-open: of many concurrent tasks exactly one probes; its failure re-opens the breaker
+    _expire_cooloff(engine)
+    results = await asyncio.gather(*(engine.filter_single_stock(s) for s in symbols))
+    assert results == [None] * len(symbols)
+    assert dhan.calls == BREAKER_THRESHOLD + 1, dhan.calls
+    assert engine._breaker_open
+
+    # A successful probe closes the breaker, but the run stays marked as tripped
+    dhan.healthy = True
+    _expire_cooloff(engine)
+    assert await engine.filter_single_stock("PROBE") is not None
+    assert not engine._breaker_open
+    assert engine.breaker_tripped
+
+
+async def test_breaker_tripped_survives_recovery_within_a_run():
+    dhan = FailingDhan()
+    engine = PremarketFilter(dhan)
+    symbols = [f"S{i:03d}" for i in range(BREAKER_THRESHOLD * 2)]
+
+    # The API recovers right after the breaker opens and the cool-off is effectively zero
+    orig_cooloff = premarket_filter.BREAKER_COOLOFF_SECONDS
+    orig_record = engine._record_fetch
+
+    def _record_and_recover(ok: bool):
+        orig_record(ok)
+        if engine._breaker_open:
+            dhan.healthy = True
+
+    engine._record_fetch = _record_and_recover
+    premarket_filter.BREAKER_COOLOFF_SECONDS = 0.0
+    try:
+        out = await engine.filter_all_stocks(symbols=symbols, max_in_flight=1)
+    finally:
+        premarket_filter.BREAKER_COOLOFF_SECONDS = orig_cooloff
+
+    # Later symbols were screened again, yet main() must not save this partial screen
+    assert out
+    assert not engine._breaker_open
+    assert engine.breaker_tripped
+
+
+async def main():
+    await test_breaker_trips_skips_and_probes_once()
+    await test_breaker_tripped_survives_recovery_within_a_run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("OK")
@@ -1,32 +1,37 @@
 import asyncio
 import time
 
+import numpy as np
 import pandas as pd
 
 from premarket_filter import PremarketFilter, REQUIRED_DAYS
 
 
+_ROWS = max(REQUIRED_DAYS, 6)
+# Built once and shared: filter_single_stock only reads the frame
+_BARS = pd.DataFrame(
+    {
+        # Ensure volume SMA passes filter threshold in tests
+        "volume": np.full(_ROWS, 1_000_000, dtype=np.int64),
+        "close": np.full(_ROWS, 100.0),
+    }
+)
+
+
 class FakeDhan:
-    async def get_historical_data_async(self, symbol: str, exchange_segment="NSE_EQ", days=15):
+    async def get_historical_data_async(self, symbol: str, exchange_segment="NSE_EQ", days=15, raise_on_error=False):
         # Simulate network latency
         await asyncio.sleep(0.05)
-        rows = max(REQUIRED_DAYS, 6)
-        return pd.DataFrame(
-            {
-                # Ensure volume SMA passes filter threshold in tests
-                "volume": [1_000_000] * rows,
-                "close": [100.0] * rows,
-            }
-        )
+        return _BARS
 
 
 async def main():
     engine = PremarketFilter(FakeDhan())
     symbols = [f"S{i:03d}" for i in range(100)]
 
-    t0 = time.time()
+    t0 = time.monotonic()
     out = await engine.filter_all_stocks(symbols=symbols, max_in_flight=20)
-    elapsed = time.time() - t0
+    elapsed = time.monotonic() - t0
 
     assert len(out) == len(symbols)
     # If concurrency is working, 100 * 0.05 / 20 ~= 0.25s + overhead.